@@ -3,10 +3,15 @@ import aiohttp
 import time
 import os
 import random
+import sys
 from io import BytesIO
 from PIL import Image
 import uuid
 
+# dùng chung cách build multipart với bench.loadgen
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lp-ocr-api"))
+from bench.corpus import BOUNDARY, multipart_body  # noqa: E402
+
 # Config
 URL = "http://103.249.117.210:3340/ocr/kafka?camera_id=2&save_img=false"
 NUM_CONCURRENT = 5  # CHỈ 5 LUỒNG ĐỒNG THỜI
@@ -32,32 +37,40 @@ def generate_fake_image():
     buffer.seek(0)
     return buffer
 
-async def get_random_image():
-    if os.path.exists(FOLDER_IMAGES) and os.listdir(FOLDER_IMAGES):
-        files = [f for f in os.listdir(FOLDER_IMAGES) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-        if files:
-            file_path = os.path.join(FOLDER_IMAGES, random.choice(files))
-            with open(file_path, 'rb') as f:
-                return BytesIO(f.read()), f"image_{uuid.uuid4().hex}.jpg"
-    buffer = generate_fake_image()
-    return buffer, f"fake_{uuid.uuid4().hex}.jpg"
+FAKE_POOL_SIZE = 32  # số ảnh giả encode sẵn
+
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+def load_payloads():
+    # đọc / encode ảnh + build sẵn body multipart 1 lần lúc khởi động, không build FormData mỗi request
+    payloads = []
+    if os.path.isdir(FOLDER_IMAGES):
+        for f in os.listdir(FOLDER_IMAGES):
+            if f.lower().endswith(('.jpg', '.jpeg', '.png')):
+                with open(os.path.join(FOLDER_IMAGES, f), 'rb') as fh:
+                    payloads.append(fh.read())
+    if not payloads:
+        payloads = [generate_fake_image().getvalue() for _ in range(FAKE_POOL_SIZE)]
+    return [multipart_body(f"image_{uuid.uuid4().hex}.jpg", p) for p in payloads]
+
+PAYLOADS = []
+
+async def get_random_body():
+    return random.choice(PAYLOADS)
 
 async def upload_image(session, counter):
     while True:
         try:
             start_req = time.time()
-            img_buffer, filename = await get_random_image()
-            
-            form = aiohttp.FormData()
-            form.add_field('file', img_buffer, filename=filename, content_type='image/jpeg')
-            form.add_field('timestamp', str(time.time()))
-            
+            body = await get_random_body()
+
             headers = {
                 "User-Agent": random_user_agent(),
                 "Connection": "keep-alive",
+                "Content-Type": CONTENT_TYPE,
             }
 
-            async with session.post(URL, data=form, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as resp:
+            async with session.post(URL, data=body, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as resp:
                 status = resp.status
                 response_text = await resp.text()
                 elapsed = time.time() - start_req
@@ -75,6 +88,7 @@ async def upload_image(session, counter):
         await asyncio.sleep(DELAY_BETWEEN)  # delay giữa các request
 
 async def main():
+    PAYLOADS.extend(load_payloads())
     counter = [0]
     start_time = time.time()
 
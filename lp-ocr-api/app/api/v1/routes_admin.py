@@ -0,0 +1,66 @@
+import asyncio
+import hmac
+import logging
+from pathlib import Path
+
+from fastapi import APIRouter, Header, HTTPException
+
+from app.api.v1.schemas import ModelLoadRequest
+from app.core.config import settings
+from app.models.registry import get_registry, spec_from_dict
+from app.services.inference_pool import get_pool
+
+router = APIRouter(prefix="/v1/admin", tags=["admin"])
+logger = logging.getLogger("routes_admin")
+
+# chỉ 1 lần swap tại 1 thời điểm
+_swap_lock = asyncio.Lock()
+
+
+def _check_token(token: str | None) -> None:
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled (ADMIN_TOKEN not set)")
+    # so sánh constant-time; bytes để header không phải ASCII không gây TypeError
+    if not hmac.compare_digest((token or "").encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.get("/models")
+def list_models(x_admin_token: str | None = Header(default=None)):
+    _check_token(x_admin_token)
+    return {"models": get_registry().describe()}
+
+
+@router.post("/models/{name}")
+async def load_model(name: str, body: ModelLoadRequest, x_admin_token: str | None = Header(default=None)):
+    """Load a weight file and atomically swap it in as model `name` (new names are added)."""
+    _check_token(x_admin_token)
+    if settings.WORKERS > 1:
+        # mỗi worker có registry / pool riêng: swap chỉ tới 1 worker -> các worker chạy weight khác nhau
+        raise HTTPException(
+            status_code=409,
+            detail=f"Hot swap is per process and WORKERS={settings.WORKERS}; change MODELS and restart app.serve",
+        )
+    if not Path(body.path).exists():
+        raise HTTPException(status_code=400, detail=f"Weight file not found: {body.path}")
+
+    registry = get_registry()
+    current = registry.spec(name) if name in registry.names() else None
+    raw = {"path": body.path}
+    for field in ("backend", "conf", "iou", "ocr_conf"):
+        value = getattr(body, field)
+        if value is None and current is not None:
+            value = getattr(current, field)
+        if value is not None:
+            raw[field] = value
+    spec = spec_from_dict(name, raw)
+
+    async with _swap_lock:
+        logger.info("Swapping model %s -> %s", name, spec.path)
+        try:
+            version = await asyncio.to_thread(get_pool().swap_model, spec)
+        except Exception as e:
+            logger.exception("Model swap failed: %s", name)
+            raise HTTPException(status_code=500, detail=f"Model load failed: {e}")
+
+    return {"name": name, "version": version, "path": spec.path, "backend": spec.backend}
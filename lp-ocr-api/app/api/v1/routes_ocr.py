@@ -1,57 +1,601 @@
+import asyncio
 import logging
+import time
+import zipfile
 from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, Query, HTTPException
-import os
-from pathlib import Path
 
-from app.services.image_io import decode_image_bytes
-from app.services.ocr_service import run_ocr
-from app.models.loader import get_model
-from app.api.v1.schemas import OCRResponse
+import orjson
+from fastapi import (
+    APIRouter, UploadFile, File, Header, Query, HTTPException, Request, Response, WebSocket, WebSocketDisconnect,
+)
+from fastapi.responses import PlainTextResponse
+
+from app.core import readiness
+from app.core.config import settings
+from app.core.metrics import IN_FLIGHT, REQUESTS, STAGE_SECONDS, STREAM_FRAMES_DROPPED
+from app.core.uploads import MB, read_body
+from app.models.registry import UnknownModelError, get_registry
+from app.services.archive import get_archiver
+from app.services.batcher import DeadlineExceededError, Schedule, check_deadline, get_batcher
+from app.services.inference_pool import get_pool, QueueFullError
+from app.services.image_io import DecodedImage, ImageTooLargeError, read_image_bundle
+from app.services.plate_locator import PlateLocator, get_locator, plate_box
+from app.services.plate_tracker import get_tracker
+from app.services.stream import LatestFrameMailbox, StreamFrame
+from app.services.result_cache import get_cache, content_key, perceptual_key
+from app.api.v1.schemas import BatchOCRItem, BatchOCRResponse, OCRResponse
 
 router = APIRouter(prefix="/v1", tags=["ocr"])
 logger = logging.getLogger("routes_ocr")
 
-# Tạo folder lưu ảnh
-IMG_FOLDER = Path(__file__).parent.parent.parent.parent / "img"
-IMG_FOLDER.mkdir(exist_ok=True)
+RAW_CONTENT_TYPES = ("image/", "application/octet-stream")
+
+
+def _server_busy(timestamp: str, e: Exception) -> HTTPException:
+    logger.warning(f"[{timestamp}] Overloaded: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="Server busy, retry later",
+        headers={"Retry-After": str(settings.RETRY_AFTER_S)},
+    )
+
+
+def _schedule(cam: str, priority: int | None, deadline_ms: float | None, received_at: float) -> Schedule:
+    """Query / header value, else CAMERA_PRIORITY / DEFAULT_*; deadline_ms counts from `received_at` (perf_counter)."""
+    if priority is None:
+        priority = settings.CAMERA_PRIORITY.get(cam, settings.DEFAULT_PRIORITY)
+    if deadline_ms is None:
+        deadline_ms = settings.DEFAULT_DEADLINE_MS
+    deadline = received_at + deadline_ms / 1000 if deadline_ms > 0 else None
+    return Schedule(priority=priority, deadline=deadline, camera_id=cam)
 
 
 @router.post("/ocr", response_model=OCRResponse)
 async def ocr_endpoint(
-    file: UploadFile = File(...),
+    request: Request,
+    file: UploadFile | None = File(default=None, description="multipart; hoặc gửi thẳng body image/jpeg"),
+    conf_threshold: float | None = Query(default=None, ge=0.0, le=1.0),
+    camera_id: int | None = Query(default=None),
+    model: str | None = Query(default=None),
+    verbose: bool = Query(default=False, description="thêm detections, reason, latency_ms, timings_ms"),
+    archive: bool = Query(default=True, description="false khi replay ảnh đã lưu (bench.replay)"),
+    priority: int | None = Query(default=None, description="lớn hơn = chạy trước; hoặc header X-Priority"),
+    deadline_ms: float | None = Query(default=None, gt=0, description="quá hạn khi còn chờ = 504; hoặc X-Deadline-Ms"),
+    x_priority: int | None = Header(default=None),
+    x_deadline_ms: float | None = Header(default=None, gt=0),
+):
+    timings = {} if verbose else None
+    timestamp, result = await _observed(
+        request, file, conf_threshold, camera_id, model, timings, archive,
+        priority if priority is not None else x_priority,
+        deadline_ms if deadline_ms is not None else x_deadline_ms,
+    )
+    # Return text và timestamp (+ biển số đã gộp nhiều frame nếu có camera_id)
+    body = {"text": result.get("text", ""), "timestamp": timestamp}
+    body.update(_track_plate(camera_id, result))
+    if verbose:
+        body.update(
+            detections=result.get("detections", []),
+            reason=result.get("reason"),
+            latency_ms=result.get("latency_ms"),
+            timings_ms=timings,
+        )
+    # dict -> orjson trực tiếp, không validate lại bằng pydantic mỗi request (OCRResponse chỉ để docs)
+    return _json(body)
+
+
+@router.post("/ocr/raw", response_class=PlainTextResponse)
+@router.post("/ocr/raw/{camera_id}", response_class=PlainTextResponse)
+async def ocr_raw_endpoint(
+    request: Request,
+    camera_id: int | None = None,
+    x_camera_id: int | None = Header(default=None),
     conf_threshold: float | None = Query(default=None, ge=0.0, le=1.0),
+    model: str | None = Query(default=None),
+    format: str = Query(default="text", pattern="^(text|json|event)$"),
+    priority: int | None = Query(default=None),
+    deadline_ms: float | None = Query(default=None, gt=0),
+    x_priority: int | None = Header(default=None),
+    x_deadline_ms: float | None = Header(default=None, gt=0),
+):
+    """
+    Body = raw JPEG (Content-Length or chunked), camera from path, ?camera_id= or X-Camera-Id.
+    Response is just the plate text, or {"text": "..."} with format=json, so a camera
+    can keep one keep-alive connection and parse a few bytes per frame.
+    format=event returns the stabilised plate only on the frame that emits the
+    vehicle's plate event and an empty body otherwise. Without a tracker
+    (TRACK_ENABLED=false, app.serve with WORKERS > 1, or no camera id) it falls back to
+    this frame's text, so a gate keeps reporting plates (one per frame, not per vehicle).
+    """
+    if camera_id is None:
+        camera_id = x_camera_id
+    _, result = await _observed(
+        request, None, conf_threshold, camera_id, model,
+        priority=priority if priority is not None else x_priority,
+        deadline_ms=deadline_ms if deadline_ms is not None else x_deadline_ms,
+    )
+    text = result.get("text", "")
+    track = _track_plate(camera_id, result)
+    if format == "event":
+        if get_tracker() is None or camera_id is None:
+            return PlainTextResponse(text)  # không gộp được: trả text từng frame thay vì body rỗng
+        event = track.get("plate_event")
+        return PlainTextResponse(event["plate"] if event else "")
+    if format == "json":
+        body = {"text": text}
+        if track:
+            body.update(plate=track["plate"], event=track["plate_event"] is not None)
+        return _json(body)
+    return PlainTextResponse(text)
+
+
+def _json(body: dict) -> Response:
+    return Response(content=orjson.dumps(body), media_type="application/json")
+
+
+def _track_plate(camera_id: int | None, result: dict) -> dict:
+    tracker = get_tracker()
+    if tracker is None or camera_id is None:
+        return {}
+    return tracker.update(str(camera_id), result.get("detections", []))
+
+
+async def _observed(
+    request: Request,
+    file: UploadFile | None,
+    conf_threshold: float | None,
+    camera_id: int | None,
+    model: str | None,
+    timings: dict | None = None,
+    archive: bool = True,
+    priority: int | None = None,
+    deadline_ms: float | None = None,
+) -> tuple[str, dict]:
+    cam = str(camera_id) if camera_id is not None else "none"
+    t0 = time.perf_counter()
+    sched = _schedule(cam, priority, deadline_ms, t0)
+    status, reason = 500, "error"
+    IN_FLIGHT.inc(camera_id=cam)
+    try:
+        timestamp, result = await _process_upload(
+            request, file, conf_threshold, camera_id, cam, model, timings, archive, sched,
+        )
+        status, reason = 200, result.get("reason", "ok")
+        return timestamp, result
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        IN_FLIGHT.dec(camera_id=cam)
+        REQUESTS.inc(camera_id=cam, status=str(status), reason=reason)
+        _observe("total", time.perf_counter() - t0, cam, timings)
+
+
+def _observe(stage: str, seconds: float, cam: str, timings: dict | None = None) -> None:
+    """Stage histogram + per-request timings_ms (verbose response) nếu có."""
+    STAGE_SECONDS.observe(seconds, stage=stage, camera_id=cam)
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0.0) + seconds * 1000, 3)
+
+
+@router.websocket("/ocr/stream")
+async def ocr_stream(
+    websocket: WebSocket,
     camera_id: int | None = Query(default=None),
+    conf_threshold: float | None = Query(default=None, ge=0.0, le=1.0),
+    model: str | None = Query(default=None),
+    priority: int | None = Query(default=None),
+    deadline_ms: float | None = Query(default=None, gt=0),
 ):
+    """
+    Binary messages = JPEG frames of the current camera (?camera_id=, or switch with a
+    text message {"camera_id": 3}). One JSON result is sent back per processed frame;
+    each camera has a latest-frame mailbox, so frames that arrive while the previous
+    one is still in inference replace each other and only the newest is processed.
+    At most STREAM_MAX_CAMERAS cameras per connection; frames of further cameras get
+    an error message.
+    priority / deadline_ms apply to every frame, the deadline counted from the
+    frame's arrival.
+    """
+    await websocket.accept()
+    try:
+        model_name, model_tag, conf_thr = _resolve_model(model, conf_threshold)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=str(e.detail)[:120])
+        return
+
+    mailboxes: dict[int | None, LatestFrameMailbox] = {}
+    workers: list[asyncio.Task] = []
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict) -> None:
+        async with send_lock:
+            await websocket.send_text(orjson.dumps(message).decode())
+
+    async def camera_worker(cam_id: int | None, box: LatestFrameMailbox) -> None:
+        cam = str(cam_id) if cam_id is not None else "none"
+        while True:
+            frame = await box.get()
+            sched = _schedule(cam, priority, deadline_ms, frame.received_at)
+            message = await _stream_frame(frame, cam_id, cam, model_name, model_tag, conf_thr, sched)
+            message["dropped"] = box.dropped
+            await send(message)
+
+    seq = 0
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("text") is not None:
+                try:
+                    cid = orjson.loads(message["text"]).get("camera_id", camera_id)
+                    camera_id = int(cid) if cid is not None else None
+                except (ValueError, TypeError, AttributeError):
+                    await send({"error": 'Text messages must be JSON like {"camera_id": 1}'})
+                continue
+            content = message.get("bytes")
+            if not content:
+                continue
+            seq += 1
+            box = mailboxes.get(camera_id)
+            if box is None:
+                if len(mailboxes) >= settings.STREAM_MAX_CAMERAS:
+                    await send({"camera_id": camera_id, "seq": seq,
+                                "error": f"Too many cameras on one connection (max {settings.STREAM_MAX_CAMERAS})"})
+                    continue
+                box = mailboxes[camera_id] = LatestFrameMailbox()
+                workers.append(asyncio.create_task(camera_worker(camera_id, box)))
+            if box.put(StreamFrame(seq=seq, content=content)) is not None:
+                STREAM_FRAMES_DROPPED.inc(camera_id=str(camera_id) if camera_id is not None else "none")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def _stream_frame(
+    frame: StreamFrame,
+    camera_id: int | None,
+    cam: str,
+    model_name: str,
+    model_tag: str,
+    conf_thr: float,
+    sched: Schedule | None = None,
+) -> dict:
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    content = await file.read()
+    message = {"camera_id": camera_id, "seq": frame.seq, "timestamp": timestamp}
+    status, reason, result = "200", "error", None
+    IN_FLIGHT.inc(camera_id=cam)
+    try:
+        if not readiness.is_ready():
+            status, message["error"] = "503", "Model is loading"
+        elif _too_large(frame.content):
+            status, message["error"] = "413", f"File larger than {settings.MAX_UPLOAD_MB} MB"
+        else:
+            try:
+                result = await _ocr_content(frame.content, conf_thr, model_name, model_tag, cam, sched=sched)
+                if result is None:
+                    status, message["error"] = "400", "Cannot decode image"
+            except QueueFullError:
+                status, message["error"] = "503", "Server busy, frame dropped"
+            except DeadlineExceededError:
+                status, message["error"] = "504", "Deadline exceeded, frame dropped"
+            except ImageTooLargeError as e:
+                status, message["error"] = "413", str(e)
+            except Exception:
+                # lỗi inference không được làm chết worker của camera (mailbox sẽ không ai đọc nữa)
+                logger.exception(f"[{timestamp}] Stream frame failed | camera={cam} | seq={frame.seq}")
+                status, message["error"] = "500", "Inference failed"
+    finally:
+        IN_FLIGHT.dec(camera_id=cam)
+        if result is not None:
+            reason = result.get("reason", "ok")
+        REQUESTS.inc(camera_id=cam, status=status, reason=reason)
+        _observe("total", time.perf_counter() - frame.received_at, cam)
+
+    if result is not None:
+        message["text"] = result.get("text", "")
+        message.update(_track_plate(camera_id, result))
+        archiver = get_archiver()
+        if archiver is not None:
+            await archiver.submit(frame.content, camera_id)
+    message["latency_ms"] = round((time.perf_counter() - frame.received_at) * 1000, 2)
+    return message
+
+
+def _check_ready() -> None:
+    if not readiness.is_ready():
+        raise HTTPException(
+            status_code=503,
+            detail="Model is loading",
+            headers={"Retry-After": str(settings.RETRY_AFTER_S)},
+        )
+
+
+def _resolve_model(model: str | None, conf_threshold: float | None) -> tuple[str, str, float]:
+    registry = get_registry()
+    try:
+        model_name = registry.resolve(model)
+    except UnknownModelError:
+        raise HTTPException(status_code=400, detail=f"Unknown model '{model}', available: {registry.names()}")
+    conf_thr = float(conf_threshold if conf_threshold is not None else registry.spec(model_name).ocr_conf)
+    return model_name, registry.tag(model_name), conf_thr
+
+
+def _too_large(content: bytes | bytearray) -> bool:
+    return len(content) > settings.MAX_UPLOAD_MB * 1024 * 1024
+
+
+async def _ocr_content(
+    content: bytes | bytearray,
+    conf_thr: float,
+    model_name: str,
+    model_tag: str,
+    cam: str,
+    timings: dict | None = None,
+    sched: Schedule | None = None,
+) -> dict | None:
+    """
+    Cache -> decode -> batcher, boxes in source-image pixels.
+    None = ảnh không decode được; QueueFullError / ImageTooLargeError / DeadlineExceededError để caller xử lý.
+    """
+    roi = settings.CAMERA_ROI.get(cam)
+    roi = tuple(roi) if roi else None
+    cache = get_cache()
+    cache_key = None
+    if cache is not None and cache.mode == "exact":
+        t = time.perf_counter()
+        cache_key = content_key(content, conf_thr, model_tag, roi)
+        result = cache.get(cache_key)
+        _observe("cache_lookup", time.perf_counter() - t, cam, timings)
+        if result is not None:
+            return result
+
+    check_deadline(sched)  # quá hạn rồi thì không decode nữa
+    pool = get_pool()
+    locator = get_locator()
+    plate_roi = locator.cached(cam) if locator is not None else None
+    decoded = await _decode(pool, content, plate_roi or roi, cam, timings)
+    if decoded is None:
+        return None
+
+    if cache is not None and cache.mode == "phash":
+        cache_key = await pool.run_light(
+            perceptual_key, decoded.img, conf_thr, model_tag, plate_roi or roi, settings.CACHE_PHASH_SIZE,
+        )
+        result = cache.get(cache_key)
+        if result is not None:
+            return result
+
+    if locator is None:
+        result = await _read(decoded, conf_thr, model_name, cam, timings, sched)
+    else:
+        result = await _read_located(
+            locator, pool, content, decoded, plate_roi, roi, conf_thr, model_name, cam, timings, sched,
+        )
+    if cache is not None:
+        cache.put(cache_key, result)
+    return result
+
+
+async def _decode(
+    pool, content: bytes | bytearray, roi: tuple | None, cam: str, timings: dict | None = None,
+) -> DecodedImage | None:
+    t = time.perf_counter()
+    decoded = await pool.decode(content, roi)
+    _observe("decode", time.perf_counter() - t, cam, timings)
+    return decoded
+
+
+async def _read(
+    decoded: DecodedImage,
+    conf_thr: float,
+    model_name: str,
+    cam: str,
+    timings: dict | None = None,
+    sched: Schedule | None = None,
+) -> dict:
+    result = await get_batcher().submit(decoded.img, conf_threshold=conf_thr, model=model_name, sched=sched)
+    run_timings = result.get("timings_ms", {})
+    for stage in ("forward", "postprocess"):
+        if stage in run_timings:
+            _observe(stage, run_timings[stage] / 1000, cam, timings)
+    return decoded.map_result(result)
+
+
+async def _read_located(
+    locator: PlateLocator,
+    pool,
+    content: bytes | bytearray,
+    decoded: DecodedImage,
+    plate_roi: tuple | None,
+    roi: tuple | None,
+    conf_thr: float,
+    model_name: str,
+    cam: str,
+    timings: dict | None = None,
+    sched: Schedule | None = None,
+) -> dict:
+    """Two-stage read: chars on the plate crop; `decoded` is that crop when plate_roi was cached."""
+    t0 = time.time()
+    if plate_roi is not None:
+        result = await _read(decoded, conf_thr, model_name, cam, timings, sched)
+        if result.get("detections"):
+            locator.remember(cam, plate_box(result["detections"]), decoded.source_size)
+            return result
+        # biển số không còn ở vùng cũ (xe di chuyển / xe khác): đọc lại cả frame
+        locator.forget(cam)
+        decoded = await _decode(pool, content, roi, cam, timings)
+
+    if locator.detector:
+        t = time.perf_counter()
+        found = await _read(decoded, get_registry().spec(locator.detector).ocr_conf, locator.detector, cam, sched=sched)
+        _observe("locate", time.perf_counter() - t, cam, timings)
+        box = plate_box(found.get("detections", []))
+        if box is None:
+            return {"text": "", "detections": [], "reason": "no_plate", "latency_ms": int((time.time() - t0) * 1000)}
+        decoded = await _decode(pool, content, locator.window(box, decoded.source_size), cam, timings)
+
+    result = await _read(decoded, conf_thr, model_name, cam, timings, sched)
+    box = plate_box(result.get("detections", []))
+    if box is not None:
+        locator.remember(cam, box, decoded.source_size)
+    return result
+
+
+async def _read_upload(request: Request, file: UploadFile | None) -> tuple[bytes | bytearray, str | None]:
+    if file is not None:
+        return await file.read(), file.filename
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(RAW_CONTENT_TYPES):
+        # body ảnh thô (ESP32 không cần build multipart): đọc thẳng vào 1 buffer cấp phát sẵn
+        return await read_body(request, settings.MAX_UPLOAD_MB * MB), None
+    raise HTTPException(status_code=400, detail="Send multipart field `file` or an image/jpeg body")
+
+
+async def _process_upload(
+    request: Request,
+    file: UploadFile | None,
+    conf_threshold: float | None,
+    camera_id: int | None,
+    cam: str,
+    model: str | None,
+    timings: dict | None = None,
+    archive: bool = True,
+    sched: Schedule | None = None,
+) -> tuple[str, dict]:
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    _check_ready()
+
+    t = time.perf_counter()
+    content, filename = await _read_upload(request, file)
+    _observe("upload_read", time.perf_counter() - t, cam, timings)
     if not content:
         logger.warning(f"[{timestamp}] Empty file uploaded")
         raise HTTPException(status_code=400, detail="Empty file")
+    if _too_large(content):
+        raise HTTPException(status_code=413, detail=f"File larger than {settings.MAX_UPLOAD_MB} MB")
 
-    img = decode_image_bytes(content)
-    if img is None:
-        logger.warning(f"[{timestamp}] Cannot decode image: {file.filename}")
+    model_name, model_tag, conf_thr = _resolve_model(model, conf_threshold)
+    try:
+        result = await _ocr_content(content, conf_thr, model_name, model_tag, cam, timings, sched)
+    except QueueFullError as e:
+        raise _server_busy(timestamp, e)
+    except DeadlineExceededError as e:
+        logger.warning(f"[{timestamp}] Dropped: {e}")
+        raise HTTPException(status_code=504, detail="Deadline exceeded")
+    except ImageTooLargeError as e:
+        logger.warning(f"[{timestamp}] Rejected: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    if result is None:
+        logger.warning(f"[{timestamp}] Cannot decode image: {filename}")
         raise HTTPException(status_code=400, detail="Cannot decode image")
-    
-    model = get_model()
-    result = run_ocr(model, img, conf_threshold=conf_threshold)
-    
+
     text = result.get('text', '')
     status = "200"
-    logger.info(f"[{timestamp}] text='{text}' | status={status}")
-    
-    # Lưu ảnh vào folder img
+    logger.info(f"[{timestamp}] text='{text}' | model={model_tag} | status={status}")
+
+    # Lưu ảnh vào folder img (ghi nền, request không chờ disk)
+    archiver = get_archiver() if archive else None
+    if archiver is not None:
+        await archiver.submit(content, camera_id)
+
+    return timestamp, result
+
+
+@router.post("/ocr/batch", response_model=BatchOCRResponse)
+async def ocr_batch_endpoint(
+    files: list[UploadFile] | None = File(default=None),
+    bundle: UploadFile | None = File(default=None, description="zip / tar / tar.gz of images"),
+    conf_threshold: float | None = Query(default=None, ge=0.0, le=1.0),
+    camera_id: int | None = Query(default=None),
+    model: str | None = Query(default=None),
+    archive: bool = Query(default=True, description="false khi chạy lại ảnh đã lưu (backfill)"),
+    priority: int | None = Query(default=None, description="backfill: đặt thấp hơn camera để không chặn chúng"),
+):
+    cam = str(camera_id) if camera_id is not None else "none"
+    t0 = time.perf_counter()
+    status = 500
+    IN_FLIGHT.inc(camera_id=cam)
     try:
-        filename = f"ocr_{camera_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-        img_path = IMG_FOLDER / filename
-        
-        with open(img_path, 'wb') as f:
-            f.write(content)
-        logger.info(f"[{timestamp}] Image saved: {img_path}")
-    except Exception as e:
-        logger.error(f"[{timestamp}] Failed to save image: {str(e)}")
-    
-    # Return text và timestamp
-    return OCRResponse(text=text, timestamp=timestamp)
+        # deadline không áp dụng cho cả batch, chỉ priority
+        sched = _schedule(cam, priority, 0, t0)
+        timestamp, items = await _process_batch(files or [], bundle, conf_threshold, camera_id, cam, model, archive, sched)
+        status = 200
+        return BatchOCRResponse(results=items, timestamp=timestamp)
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        IN_FLIGHT.dec(camera_id=cam)
+        REQUESTS.inc(camera_id=cam, status=str(status), reason="batch")
+        _observe("total", time.perf_counter() - t0, cam)
+
+
+async def _process_batch(
+    files: list[UploadFile],
+    bundle: UploadFile | None,
+    conf_threshold: float | None,
+    camera_id: int | None,
+    cam: str,
+    model: str | None,
+    archive: bool,
+    sched: Schedule | None = None,
+) -> tuple[str, list[BatchOCRItem]]:
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    _check_ready()
+
+    t = time.perf_counter()
+    uploads = [(f.filename, await f.read()) for f in files]
+    if bundle is not None:
+        try:
+            uploads += await asyncio.to_thread(
+                read_image_bundle, bundle.file, settings.BATCH_MAX_FILES,
+                settings.MAX_UPLOAD_MB * MB, settings.BATCH_MAX_UPLOAD_MB * MB,
+            )
+        except (ValueError, zipfile.BadZipFile) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    _observe("upload_read", time.perf_counter() - t, cam)
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No images: send `files` and/or a zip/tar `bundle`")
+    if len(uploads) > settings.BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many images (max {settings.BATCH_MAX_FILES})")
+
+    model_name, model_tag, conf_thr = _resolve_model(model, conf_threshold)
+    # giới hạn số ảnh đang chờ batcher cùng lúc: đủ để lấp đầy batch của mọi worker,
+    # nhưng không chiếm hết BATCH_QUEUE_SIZE của các camera gửi /v1/ocr
+    limit = asyncio.Semaphore(max(1, settings.BATCH_MAX_SIZE * settings.INFERENCE_WORKERS))
+    archiver = get_archiver() if archive else None
+
+    async def one(index: int, filename: str | None, content: bytes) -> BatchOCRItem:
+        if not content:
+            return BatchOCRItem(index=index, filename=filename, error="Empty file")
+        if _too_large(content):
+            return BatchOCRItem(index=index, filename=filename, error=f"File larger than {settings.MAX_UPLOAD_MB} MB")
+        async with limit:
+            try:
+                result = await _ocr_content(content, conf_thr, model_name, model_tag, cam, sched=sched)
+            except QueueFullError as e:
+                logger.warning(f"[{timestamp}] Overloaded in batch: {e}")
+                return BatchOCRItem(index=index, filename=filename, error="Server busy, retry later")
+            except ImageTooLargeError as e:
+                return BatchOCRItem(index=index, filename=filename, error=str(e))
+        if result is None:
+            return BatchOCRItem(index=index, filename=filename, error="Cannot decode image")
+        if archiver is not None:
+            await archiver.submit(content, camera_id)
+        return BatchOCRItem(
+            index=index,
+            filename=filename,
+            text=result.get("text", ""),
+            detections=result.get("detections", []),
+            reason=result.get("reason"),
+        )
+
+    items = await asyncio.gather(*(one(i, name, content) for i, (name, content) in enumerate(uploads)))
+    ok = sum(1 for item in items if item.error is None)
+    logger.info(f"[{timestamp}] batch | images={len(items)} | ok={ok} | model={model_tag}")
+    return timestamp, list(items)
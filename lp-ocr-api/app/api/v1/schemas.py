@@ -9,6 +9,48 @@ class Detection(BaseModel):
     row_id: int
 
 
+class PlateEvent(BaseModel):
+    event_id: int
+    camera_id: str
+    plate: str
+    conf: float
+    frames: int
+    first_seen: str
+
+
 class OCRResponse(BaseModel):
     text: str
     timestamp: str | None = None
+    # consensus nhiều frame theo camera_id (None khi không gửi camera_id)
+    plate: str | None = None
+    plate_conf: float | None = None
+    plate_event: PlateEvent | None = None  # chỉ có ở frame chốt biển số của 1 xe
+    # chỉ có khi ?verbose=true
+    detections: list[Detection] | None = None
+    reason: str | None = None
+    latency_ms: int | None = None
+    # ms theo stage: upload_read, cache_lookup, decode, locate, forward, postprocess, total
+    # (cache hit thì không có decode / forward)
+    timings_ms: dict[str, float] | None = None
+
+
+class ModelLoadRequest(BaseModel):
+    path: str
+    backend: str | None = None
+    conf: float | None = None
+    iou: float | None = None
+    ocr_conf: float | None = None
+
+
+class BatchOCRItem(BaseModel):
+    index: int
+    filename: str | None = None
+    text: str = ""
+    detections: list[Detection] = []
+    reason: str | None = None
+    error: str | None = None  # lỗi riêng của ảnh này (decode, server bận), batch vẫn trả 200
+
+
+class BatchOCRResponse(BaseModel):
+    results: list[BatchOCRItem]
+    timestamp: str | None = None
@@ -11,14 +11,101 @@ class Settings(BaseSettings):
     # model
     MODEL_PATH: str = "app/models/weights/LP_ocr.pt"
     DEVICE: str = "auto"  # "auto" | "cpu" | "cuda"
+    MODEL_BACKEND: str = "torch"  # "torch" (hub) | "torchscript" | "onnxruntime"
+    EXPORT_PATH: str = ""  # rỗng = MODEL_PATH đổi đuôi .torchscript / .onnx
+    YOLOV5_REPO: str = "ultralytics/yolov5"  # hoặc thư mục repo clone sẵn (chạy offline)
+
+    # nhiều model, JSON: {"full": {"path": "...LP_ocr.pt"}, "nano": {"path": "...LP_ocr_nano.pt", "conf": 0.2}}
+    # mỗi model có thể đặt backend / conf / iou / ocr_conf; rỗng = 1 model "default" từ MODEL_PATH
+    MODELS: dict[str, dict] = {}
+    DEFAULT_MODEL: str = ""
+    ADMIN_TOKEN: str = ""  # rỗng = tắt /v1/admin
+
+    # warm-up sau khi load model
+    WARMUP_ENABLED: bool = True
+    WARMUP_WIDTH: int = 320
+    WARMUP_HEIGHT: int = 240
+    WARMUP_RUNS: int = 1
 
     # inference defaults
     YOLO_CONF: float = 0.10
     YOLO_IOU: float = 0.45
     OCR_CONF_THRESHOLD: float = 0.50
+    OCR_POSTPROCESS: str = "numpy"  # "numpy" | "pandas" (cần cài pandas)
 
     # upload constraints
-    MAX_UPLOAD_MB: int = 5
+    MAX_UPLOAD_MB: int = 5  # mỗi ảnh; body lớn hơn bị 413 ngay khi đang stream
+    MAX_IMAGE_SIDE: int = 4096  # đọc từ header JPEG/PNG, vượt quá thì 413 không decode
+
+    # decode
+    DECODE_TARGET_SIZE: int = 640  # = input size của model; JPEG lớn decode 1/2, 1/4, 1/8. 0 = luôn full size
+    # ROI theo camera (pixel ảnh gốc), JSON: {"1": [400, 300, 1200, 700]}; box trả về vẫn theo ảnh gốc
+    CAMERA_ROI: dict[str, list[int]] = {}
+
+    # 2 bước: tìm vùng biển số rồi đọc ký tự trên vùng cắt ở độ phân giải gốc
+    LOCATE_MODE: str = "off"  # "off" | "cached" (box biển số frame trước của camera) | "detector"
+    LOCATE_DETECTOR: str = ""  # LOCATE_MODE=detector: tên model trong MODELS dùng tìm biển số
+    LOCATE_MARGIN: float = 0.3  # nới box biển số theo tỉ lệ w/h mỗi bên
+    LOCATE_TTL_S: float = 2.0
+
+    # gộp kết quả nhiều frame liên tiếp của 1 camera -> 1 biển số / 1 event mỗi xe
+    TRACK_ENABLED: bool = True
+    TRACK_WINDOW: int = 15  # số frame gần nhất đem vote
+    TRACK_EXPIRY_S: float = 3.0  # không thấy biển quá lâu = xe đã đi
+    TRACK_MIN_FRAMES: int = 3
+    TRACK_MIN_CONF: float = 0.5
+    TRACK_NEW_PLATE_RATIO: float = 0.5  # giống nhau (difflib) dưới mức này = xe mới
+
+    # micro-batching
+    BATCH_MAX_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: float = 10.0
+    BATCH_QUEUE_SIZE: int = 64
+
+    # ưu tiên / deadline mỗi request (?priority=&deadline_ms= hoặc header X-Priority / X-Deadline-Ms)
+    DEFAULT_PRIORITY: int = 0  # lớn hơn = chạy trước; queue đầy thì đẩy job priority thấp nhất ra (503)
+    DEFAULT_DEADLINE_MS: float = 0.0  # 0 = không có deadline; quá hạn khi còn trong queue = 504, không chạy model
+    # priority theo camera khi request không gửi, JSON: {"1": 10}
+    CAMERA_PRIORITY: dict[str, int] = {}
+
+    # websocket /v1/ocr/stream
+    STREAM_MAX_CAMERAS: int = 16  # số camera (mailbox + task) tối đa mỗi kết nối
+
+    # /v1/ocr/batch (nhiều file hoặc 1 file zip/tar)
+    BATCH_MAX_FILES: int = 256
+    BATCH_MAX_UPLOAD_MB: int = 64  # cả request (nhiều file hoặc zip/tar)
+
+    # inference worker pool
+    INFERENCE_EXECUTOR: str = "thread"  # "thread" | "process" (1 model / process)
+    INFERENCE_WORKERS: int = 1
+    DECODE_WORKERS: int = 2
+    DECODE_QUEUE_SIZE: int = 32
+    RETRY_AFTER_S: int = 1
+
+    # CPU / thread mỗi worker (nhiều worker trên 1 máy: python -m app.serve)
+    WORKERS: int = 1  # số process uvicorn, mỗi process load model riêng
+    WORKER_INDEX: int = 0  # app.serve đặt cho từng worker
+    TORCH_THREADS: int = 0  # intra-op (cả onnxruntime); 0 = mặc định, WORKERS > 1 thì chia đều core
+    TORCH_INTEROP_THREADS: int = 0  # 0 = mặc định, WORKERS > 1 thì 1
+    CPU_AFFINITY: str = ""  # "" = không pin | "auto" (chia core theo WORKER_INDEX) | "0-3;4-7" (1 nhóm / worker)
+    PREFORK: bool = False  # load model ở process cha rồi fork worker: weight dùng chung (Linux)
+    MEMORY_REPORT_S: float = 60.0  # app.serve log RSS / unique / shared từng worker; 0 = tắt
+
+    # image archive (ghi ảnh nền, không chặn request)
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_DIR: str = "img"
+    ARCHIVE_QUEUE_SIZE: int = 256
+    ARCHIVE_WORKERS: int = 1
+    ARCHIVE_POLICY: str = "drop"  # "drop" | "block" khi disk chậm, queue đầy
+
+    # result cache (frame lặp lại khi xe đứng chờ barrier)
+    CACHE_ENABLED: bool = True
+    CACHE_MAX_ENTRIES: int = 1024
+    CACHE_TTL_S: float = 30.0
+    CACHE_MODE: str = "exact"  # "exact" (hash bytes) | "phash" (dHash ảnh đã decode)
+    # phash: xe khác cùng dáng / cùng khung cảnh có thể trùng hash -> trả biển của xe trước.
+    # Dùng kèm CAMERA_ROI hoặc LOCATE_MODE (hash vùng biển số) và TTL ngắn
+    CACHE_PHASH_SIZE: int = 12  # lưới dHash (size+1) x size; lớn hơn = ít trùng nhầm nhưng ít hit hơn (8 = 64 bit cũ)
+    CACHE_PHASH_TTL_S: float = 2.0  # thay CACHE_TTL_S khi CACHE_MODE=phash
 
 
 settings = Settings()
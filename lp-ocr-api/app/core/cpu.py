@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+import os
+
+from app.core.config import settings
+
+logger = logging.getLogger("cpu")
+
+# giá trị đã áp dụng trong process này (xem /health)
+_applied: dict = {}
+
+
+def available_cpus() -> list[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _parse_cpus(spec: str) -> list[int]:
+    """ "0-3,6" -> [0, 1, 2, 3, 6] """
+    cpus = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def affinity_for(spec: str, worker_index: int, workers: int, cpus: list[int]) -> list[int] | None:
+    """
+    CPU set for one worker. "" = no pinning; "auto" = split `cpus` into `workers`
+    equal contiguous chunks; otherwise one set per worker separated by ";"
+    (e.g. "0-3;4-7"), picked by worker_index (wraps around).
+    """
+    spec = spec.strip()
+    if not spec:
+        return None
+    if spec == "auto":
+        workers = max(1, workers)
+        per = max(1, len(cpus) // workers)
+        start = (worker_index * per) % len(cpus)
+        return cpus[start:start + per]
+    sets = [s for s in spec.split(";") if s.strip()]
+    return _parse_cpus(sets[worker_index % len(sets)])
+
+
+def configure_cpu(size_threads: bool = False) -> dict:
+    """
+    Pin this worker to its CPUs (CPU_AFFINITY) and size torch's thread pools.
+    Call once per process, before the first model forward: torch only accepts
+    set_num_interop_threads before inter-op work has started.
+
+    TORCH_THREADS / TORCH_INTEROP_THREADS = 0 means: leave torch's defaults with a
+    single worker; with several workers (or pinning) use the worker's share of
+    the cores for intra-op and 1 inter-op thread, so N workers do not each start
+    an all-core pool. size_threads=True always sets intra-op (TORCH_THREADS or the
+    worker's share): pre-fork workers inherit the parent's set_num_threads(1).
+    """
+    import torch
+
+    if _applied:
+        return _applied
+    workers = max(1, settings.WORKERS)
+    cpus = available_cpus()
+    pinned = affinity_for(settings.CPU_AFFINITY, settings.WORKER_INDEX, workers, cpus)
+    if pinned is not None:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, pinned)
+        else:
+            logger.warning("CPU_AFFINITY is not supported on this platform, ignored")
+            pinned = None
+
+    share = len(pinned) if pinned is not None else max(1, len(cpus) // workers)
+    threads = settings.TORCH_THREADS
+    if threads <= 0 and (size_threads or workers > 1 or pinned is not None):
+        threads = share
+    if threads > 0:
+        torch.set_num_threads(threads)
+
+    interop = settings.TORCH_INTEROP_THREADS
+    if interop <= 0 and (workers > 1 or pinned is not None):
+        interop = 1
+    if interop > 0:
+        try:
+            torch.set_num_interop_threads(interop)
+        except RuntimeError as e:
+            # đã chạy inter-op rồi (gọi muộn) -> giữ nguyên
+            logger.warning("Cannot set interop threads: %s", e)
+
+    _applied.update(
+        pid=os.getpid(),
+        worker_index=settings.WORKER_INDEX,
+        workers=workers,
+        affinity=pinned,
+        torch_threads=torch.get_num_threads(),
+        torch_interop_threads=torch.get_num_interop_threads(),
+    )
+    logger.info("CPU config | %s", _applied)
+    return _applied
+
+
+def intra_op_threads() -> int:
+    """Resolved intra-op thread count for non-torch runtimes (onnxruntime); 0 = runtime default."""
+    if settings.TORCH_THREADS > 0:
+        return settings.TORCH_THREADS
+    if _applied and (_applied["workers"] > 1 or _applied["affinity"] is not None):
+        return _applied["torch_threads"]
+    return 0
+
+
+def cpu_stats() -> dict:
+    return dict(_applied)
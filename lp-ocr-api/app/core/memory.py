@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+MB = 1024 * 1024
+
+
+def smaps_rollup(pid: int | str = "self") -> dict[str, int] | None:
+    """/proc/<pid>/smaps_rollup in bytes (Linux >= 4.14); None elsewhere."""
+    try:
+        text = Path(f"/proc/{pid}/smaps_rollup").read_text()
+    except OSError:
+        return None
+    out = {}
+    for line in text.splitlines()[1:]:
+        key, _, rest = line.partition(":")
+        parts = rest.split()
+        if len(parts) == 2 and parts[1] == "kB":
+            out[key] = int(parts[0]) * 1024
+    return out
+
+
+def memory_stats(pid: int | str = "self") -> dict | None:
+    """
+    rss: everything mapped; unique (USS): private pages, what killing the process
+    frees; shared: pages also mapped by other processes (pre-fork weights, libs);
+    pss: unique + shared split evenly between the sharers.
+    """
+    r = smaps_rollup(pid)
+    if r is None:
+        return None
+    return {
+        "rss_mb": round(r.get("Rss", 0) / MB, 1),
+        "pss_mb": round(r.get("Pss", 0) / MB, 1),
+        "unique_mb": round((r.get("Private_Clean", 0) + r.get("Private_Dirty", 0)) / MB, 1),
+        "shared_mb": round((r.get("Shared_Clean", 0) + r.get("Shared_Dirty", 0)) / MB, 1),
+        "swap_mb": round(r.get("Swap", 0) / MB, 1),
+    }
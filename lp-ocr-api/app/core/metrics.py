@@ -0,0 +1,196 @@
+"""
+Minimal Prometheus text-format metrics (no prometheus_client dependency).
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Callable
+
+_LOCK = threading.Lock()
+_REGISTRY: list["_Metric"] = []
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with _LOCK:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        with _LOCK:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Set directly, or pass `collect` returning {label_values_tuple: value} at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 collect: Callable[[], dict[tuple, float]] | None = None):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+        self._collect = collect
+
+    def set(self, value: float, **labels) -> None:
+        with _LOCK:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with _LOCK:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> list[str]:
+        if self._collect is not None:
+            items = list(self._collect().items())
+        else:
+            with _LOCK:
+                items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with _LOCK:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def _samples(self) -> list[str]:
+        with _LOCK:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, row in items:
+            acc = 0.0
+            for le, count in zip(self.buckets + (float("inf"),), row[:-1]):
+                acc += count
+                le_label = 'le="%s"' % _fmt_value(le)
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le_label)} {_fmt_value(acc)}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(row[-1])}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {_fmt_value(acc)}")
+        return lines
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---- OCR metrics ----
+
+STAGE_SECONDS = Histogram(
+    "ocr_stage_seconds",
+    "Time spent per pipeline stage (upload_read, cache_lookup, decode, locate, forward, postprocess, archive_write, total).",
+    ("stage", "camera_id"),
+)
+REQUESTS = Counter(
+    "ocr_requests_total",
+    "OCR requests by HTTP status and run_ocr reason.",
+    ("camera_id", "status", "reason"),
+)
+IN_FLIGHT = Gauge(
+    "ocr_in_flight_requests",
+    "OCR requests currently being handled.",
+    ("camera_id",),
+)
+QUEUE_DEPTH = Gauge(
+    "ocr_queue_depth",
+    "Jobs waiting per internal queue (batch, decode, archive).",
+    ("queue",),
+)
+INFERENCE_IN_FLIGHT = Gauge(
+    "ocr_inference_batches_in_flight",
+    "Batches currently running in the inference pool.",
+)
+CACHE_LOOKUPS = Counter(
+    "ocr_cache_lookups_total",
+    "Result cache lookups by result (hit, miss).",
+    ("result",),
+)
+STREAM_FRAMES_DROPPED = Counter(
+    "ocr_stream_frames_dropped_total",
+    "WebSocket frames replaced by a newer frame of the same camera before inference.",
+    ("camera_id",),
+)
+PLATE_EVENTS = Counter(
+    "ocr_plate_events_total",
+    "Stabilised plate events (one per vehicle) emitted by the per-camera tracker.",
+    ("camera_id",),
+)
+DEADLINE_MISSES = Counter(
+    "ocr_deadline_misses_total",
+    "Requests past their deadline_ms: dropped before inference (dropped) or answered after it (late).",
+    ("camera_id", "outcome"),
+)
+QUEUE_EVICTIONS = Counter(
+    "ocr_queue_evictions_total",
+    "Queued jobs failed with 503 to make room for a higher-priority request.",
+    ("priority",),
+)
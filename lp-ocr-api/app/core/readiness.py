@@ -0,0 +1,27 @@
+"""
+Readiness (model loaded + warmed up) kept separate from liveness (/health).
+"""
+from __future__ import annotations
+
+_ready = False
+_error: str | None = None
+
+
+def set_ready() -> None:
+    global _ready, _error
+    _ready = True
+    _error = None
+
+
+def set_failed(error: str) -> None:
+    global _ready, _error
+    _ready = False
+    _error = error
+
+
+def is_ready() -> bool:
+    return _ready
+
+
+def status() -> dict:
+    return {"ready": _ready, "error": _error}
@@ -0,0 +1,136 @@
+"""
+Request body size limits.
+
+UploadLimitMiddleware rejects a body with 413 as soon as Content-Length or the
+bytes streamed so far exceed the limit, before python-multipart buffers it.
+read_body reads a raw (non-multipart) body straight into one preallocated buffer.
+"""
+from __future__ import annotations
+
+import logging
+
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+
+logger = logging.getLogger("uploads")
+
+MB = 1024 * 1024
+MULTIPART_OVERHEAD = 64 * 1024  # boundary + header của các part
+
+
+class BodyTooLargeError(HTTPException):
+    # là HTTPException để FastAPI không gói thành 400 khi lỗi xảy ra lúc parse multipart
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Request body larger than {limit // MB} MB")
+        self.limit = limit
+
+
+def body_limit(path: str) -> int:
+    if path.startswith("/v1/ocr/batch"):
+        return settings.BATCH_MAX_UPLOAD_MB * MB
+    return settings.MAX_UPLOAD_MB * MB + MULTIPART_OVERHEAD
+
+
+def _content_length(headers) -> int | None:
+    value = headers.get("content-length")
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+async def read_body(request: Request, limit: int) -> bytearray:
+    """
+    Raw request body (Content-Length or chunked) as a bytearray, 413 over `limit`.
+    With Content-Length the buffer is allocated once and chunks are copied in place;
+    np.frombuffer / cv2.imdecode read it without another copy.
+    """
+    length = _content_length(request.headers)
+    if length is not None and length > limit:
+        raise BodyTooLargeError(limit)
+
+    if length is not None:
+        buf = bytearray(length)
+        view = memoryview(buf)
+        pos = 0
+        async for chunk in request.stream():
+            end = pos + len(chunk)
+            if end > length:
+                raise HTTPException(status_code=400, detail="Body longer than Content-Length")
+            view[pos:end] = chunk
+            pos = end
+        view.release()
+        if pos != length:
+            del buf[pos:]  # client ngắt sớm
+        return buf
+
+    # chunked: không biết trước kích thước, nối dần tới limit
+    buf = bytearray()
+    async for chunk in request.stream():
+        if len(buf) + len(chunk) > limit:
+            raise BodyTooLargeError(limit)
+        buf += chunk
+    return buf
+
+
+class UploadLimitMiddleware:
+    """Pure ASGI middleware: counts body bytes per request and answers 413 early."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT"):
+            await self.app(scope, receive, send)
+            return
+
+        limit = body_limit(scope["path"])
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        length = _content_length(headers)
+        if length is not None and length > limit:
+            await _reject(scope, send, limit)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise BodyTooLargeError(limit)
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except BodyTooLargeError:
+            if started:
+                raise
+            await _reject(scope, send, limit)
+
+
+async def _reject(scope, send, limit: int) -> None:
+    logger.warning("413 %s: body over %d MB", scope["path"], limit // MB)
+    body = b'{"detail":"Request body too large"}'
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            # phần body còn lại chưa đọc, đóng kết nối thay vì đọc bỏ
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
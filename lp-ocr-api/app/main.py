@@ -1,28 +1,91 @@
+import asyncio
 import logging
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core import metrics, readiness
 from app.core.config import settings
+from app.core.cpu import configure_cpu, cpu_stats
 from app.core.logging import setup_logging
+from app.core.memory import memory_stats
+from app.core.uploads import UploadLimitMiddleware
+from app.api.v1.routes_admin import router as admin_router
 from app.api.v1.routes_ocr import router as ocr_router
-from app.models.loader import load_model_once
+from app.services.archive import get_archiver, start_archiver, stop_archiver
+from app.services.batcher import start_batcher, stop_batcher
+from app.services.inference_pool import start_pool, stop_pool
+from app.services.plate_locator import get_locator
+from app.services.plate_tracker import get_tracker
+from app.services.result_cache import get_cache
+from app.models.loader import startup_timings
 
 setup_logging()
 logger = logging.getLogger("main")
 
 app = FastAPI(title=settings.APP_NAME)
+app.add_middleware(UploadLimitMiddleware)
+
+
+_load_task: asyncio.Task | None = None
+
+
+async def _load_and_warmup():
+    # load model + warm-up chạy nền: /health trả lời ngay, /ready chờ tới khi xong
+    try:
+        await asyncio.to_thread(start_pool)
+        start_batcher()
+        readiness.set_ready()
+        logger.info("Ready. | %s", " | ".join(f"{k}={v:.0f}ms" for k, v in startup_timings.items()))
+    except Exception as e:
+        logger.exception("Model startup failed")
+        readiness.set_failed(str(e))
 
 @app.on_event("startup")
-def on_startup():
-    # load model 1 lần khi start
-    load_model_once()
+async def on_startup():
+    global _load_task
+    configure_cpu()  # trước khi load model: số thread torch, pin CPU theo WORKER_INDEX
+    if settings.TRACK_ENABLED and settings.WORKERS > 1:
+        logger.warning("TRACK_ENABLED with WORKERS=%d: tracks are per worker, plate events may be split "
+                       "or duplicated; use app.serve (disables tracking) or WORKERS=1", settings.WORKERS)
+    start_archiver()
+    _load_task = asyncio.create_task(_load_and_warmup())
     logger.info("Startup complete.")
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    if _load_task is not None and not _load_task.done():
+        _load_task.cancel()
+    await stop_batcher()
+    stop_pool()
+    await stop_archiver()
+
 @app.get("/")
 def root():
-    return JSONResponse({"message": "OCR API", "version": "1.0", "endpoints": {"/health": "GET", "/v1/ocr": "POST"}})
+    return JSONResponse({"message": "OCR API", "version": "1.0", "endpoints": {"/health": "GET", "/ready": "GET", "/metrics": "GET", "/v1/ocr": "POST", "/v1/ocr/batch": "POST", "/v1/ocr/raw/{camera_id}": "POST", "/v1/ocr/stream": "WS"}})
 
 @app.get("/health")
 def health():
-    return {"status": "CÒN SỐNG"}
+    archiver = get_archiver()
+    cache = get_cache()
+    tracker = get_tracker()
+    locator = get_locator()
+    return {
+        "status": "CÒN SỐNG",
+        "archive": archiver.stats() if archiver else None,
+        "cache": cache.stats() if cache else None,
+        "tracker": tracker.stats() if tracker else None,
+        "locator": locator.stats() if locator else None,
+        "cpu": cpu_stats(),
+        "memory": memory_stats(),
+    }
+
+@app.get("/ready")
+def ready():
+    body = {**readiness.status(), "startup_ms": {k: round(v, 1) for k, v in startup_timings.items()}}
+    return JSONResponse(body, status_code=200 if readiness.is_ready() else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 app.include_router(ocr_router)
+app.include_router(admin_router)
@@ -0,0 +1,195 @@
+"""
+Lean inference backends for exported YOLOv5 weights (TorchScript / ONNX Runtime).
+
+They do not need the ultralytics/yolov5 hub repo: preprocessing (letterbox)
+and NMS are done here with NumPy, and calls return a `Detections` object with
+the same `xyxy` / `names` attributes run_ocr reads from hub results.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("model_backends")
+
+MAX_WH = 7680  # offset box theo class để NMS theo từng class
+MAX_NMS = 30000
+MAX_DET = 1000
+
+
+class Detections:
+    """Minimal stand-in for yolov5 `Detections`: one (N, 6) array per image."""
+
+    def __init__(self, xyxy: list[np.ndarray], names: dict[int, str]):
+        self.xyxy = xyxy
+        self.names = names
+
+
+def read_meta(export_path: Path) -> dict:
+    meta_path = export_path.with_suffix(export_path.suffix + ".json")
+    if not meta_path.exists():
+        raise FileNotFoundError(f"Export metadata not found: {meta_path} (run python -m app.models.export)")
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["names"] = {int(k): v for k, v in meta["names"].items()}
+    return meta
+
+
+def letterbox(img: np.ndarray, shape: tuple[int, int]) -> tuple[np.ndarray, float, tuple[float, float]]:
+    """Resize keeping aspect ratio, pad with 114 to `shape` (h, w). Same as yolov5 letterbox(auto=False)."""
+    h, w = img.shape[:2]
+    r = min(shape[0] / h, shape[1] / w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+    if (new_w, new_h) != (w, h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    dw, dh = (shape[1] - new_w) / 2, (shape[0] - new_h) / 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    img = cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return img, r, (dw, dh)
+
+
+def batch_shape(imgs: list[np.ndarray], size: int, stride: int) -> tuple[int, int]:
+    """Rectangular inference shape like AutoShape: longest side -> size, rounded up to stride."""
+    hs, ws = [], []
+    for im in imgs:
+        h, w = im.shape[:2]
+        g = size / max(h, w)
+        hs.append(h * g)
+        ws.append(w * g)
+    return (int(np.ceil(max(hs) / stride) * stride), int(np.ceil(max(ws) / stride) * stride))
+
+
+def _nms(boxes: np.ndarray, scores: np.ndarray, iou_thres: float) -> np.ndarray:
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        if len(keep) >= MAX_DET:
+            break
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_thres]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def non_max_suppression(pred: np.ndarray, conf_thres: float, iou_thres: float) -> np.ndarray:
+    """pred: (N, 5 + nc) [cx, cy, w, h, obj, cls...] -> (M, 6) [x1, y1, x2, y2, conf, cls]."""
+    pred = pred[pred[:, 4] > conf_thres]
+    if not len(pred):
+        return np.zeros((0, 6), dtype=np.float32)
+    scores = pred[:, 5:] * pred[:, 4:5]
+    cls = scores.argmax(1)
+    conf = scores[np.arange(len(scores)), cls]
+    mask = conf > conf_thres
+    pred, cls, conf = pred[mask], cls[mask], conf[mask]
+    if not len(pred):
+        return np.zeros((0, 6), dtype=np.float32)
+    if len(pred) > MAX_NMS:
+        top = conf.argsort()[::-1][:MAX_NMS]
+        pred, cls, conf = pred[top], cls[top], conf[top]
+
+    boxes = np.empty((len(pred), 4), dtype=np.float32)
+    boxes[:, 0] = pred[:, 0] - pred[:, 2] / 2
+    boxes[:, 1] = pred[:, 1] - pred[:, 3] / 2
+    boxes[:, 2] = pred[:, 0] + pred[:, 2] / 2
+    boxes[:, 3] = pred[:, 1] + pred[:, 3] / 2
+    keep = _nms(boxes + (cls[:, None] * MAX_WH), conf, iou_thres)
+    return np.concatenate([boxes[keep], conf[keep, None], cls[keep, None].astype(np.float32)], axis=1)
+
+
+class _LeanBackend:
+    """
+    Shared pre/post-processing. Subclasses implement `_forward` on a float32
+    (B, 3, H, W) batch and return raw (B, N, 5 + nc) predictions.
+    """
+
+    def __init__(self, export_path: Path):
+        meta = read_meta(export_path)
+        self.path = export_path
+        self.names: dict[int, str] = meta["names"]
+        self.imgsz = int(meta.get("imgsz", 640))
+        self.stride = int(meta.get("stride", 32))
+        # export cũ (input cố định) thì phải letterbox về hình vuông imgsz
+        self.dynamic = bool(meta.get("dynamic", False))
+        self.conf = 0.25
+        self.iou = 0.45
+
+    def to(self, device: str):
+        return self
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def __call__(self, imgs) -> Detections:
+        if not isinstance(imgs, list):
+            imgs = [imgs]
+        # giữ nguyên thứ tự kênh như ảnh đưa vào (AutoShape của hub cũng không đổi BGR/RGB)
+        shape = batch_shape(imgs, self.imgsz, self.stride) if self.dynamic else (self.imgsz, self.imgsz)
+        boxed = [letterbox(im, shape) for im in imgs]
+        batch = np.stack([b[0] for b in boxed]).transpose(0, 3, 1, 2)
+        batch = np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+        pred = self._forward(batch)
+
+        out = []
+        for p, im, (_, r, (dw, dh)) in zip(pred, imgs, boxed):
+            det = non_max_suppression(p, self.conf, self.iou)
+            det[:, [0, 2]] = ((det[:, [0, 2]] - dw) / r).clip(0, im.shape[1])
+            det[:, [1, 3]] = ((det[:, [1, 3]] - dh) / r).clip(0, im.shape[0])
+            out.append(det)
+        return Detections(out, self.names)
+
+
+class TorchScriptBackend(_LeanBackend):
+    def __init__(self, export_path: Path, device: str = "cpu"):
+        super().__init__(export_path)
+        import torch
+
+        self._torch = torch
+        self.device = device
+        self._module = torch.jit.load(str(export_path), map_location=device).eval()
+
+    def to(self, device: str):
+        self.device = device
+        self._module.to(device)
+        return self
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        torch = self._torch
+        with torch.inference_mode():
+            y = self._module(torch.from_numpy(batch).to(self.device))
+        if isinstance(y, (list, tuple)):
+            y = y[0]
+        return y.float().cpu().numpy()
+
+
+class OnnxRuntimeBackend(_LeanBackend):
+    def __init__(self, export_path: Path, device: str = "cpu", threads: int = 0):
+        super().__init__(export_path)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("MODEL_BACKEND=onnxruntime requires `pip install onnxruntime`") from e
+
+        providers = ["CPUExecutionProvider"]
+        if device == "cuda" and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self._session = ort.InferenceSession(str(export_path), sess_options=options, providers=providers)
+        self._input = self._session.get_inputs()[0].name
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        return self._session.run(None, {self._input: batch})[0]
@@ -0,0 +1,98 @@
+"""
+Export MODEL_PATH once to TorchScript / ONNX for the lean backends.
+
+    python -m app.models.export --format onnx
+    python -m app.models.export --format torchscript --imgsz 640
+
+Writes <out> plus <out>.json (class names, input size) next to it.
+Needs the hub repo only here, at export time.
+"""
+from __future__ import annotations
+
+import argparse
+import inspect
+import json
+import logging
+from pathlib import Path
+
+import torch
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.models.loader import load_hub_model
+
+logger = logging.getLogger("model_export")
+
+BACKEND_FOR_FORMAT = {"torchscript": "torchscript", "onnx": "onnxruntime"}
+
+
+def _detection_model(hub_model):
+    # AutoShape -> DetectMultiBackend -> DetectionModel
+    model = hub_model.model
+    while not hasattr(model, "stride") or hasattr(model, "pt"):
+        model = model.model
+    model = model.float().eval()
+    for m in model.modules():
+        if m.__class__.__name__ == "Detect":
+            m.export = True  # Detect trả về 1 tensor (B, N, 5 + nc) thay vì tuple
+            m.dynamic = True  # tính lại grid theo H, W của input -> chạy được ảnh chữ nhật
+    return model
+
+
+def export(fmt: str, weights: Path, out: Path, imgsz: int, opset: int) -> Path:
+    hub_model = load_hub_model(weights, "cpu")
+    names = hub_model.names if isinstance(hub_model.names, dict) else dict(enumerate(hub_model.names))
+    model = _detection_model(hub_model)
+    dummy = torch.zeros(1, 3, imgsz, imgsz)
+
+    with torch.inference_mode():
+        model(dummy)  # dry run
+
+    logger.info("Exporting %s -> %s | imgsz=%d", weights, out, imgsz)
+    if fmt == "torchscript":
+        traced = torch.jit.trace(model, dummy, strict=False)
+        traced.save(str(out))
+    else:
+        kwargs = {}
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            kwargs["dynamo"] = False  # torch mới mặc định dùng dynamo exporter (cần onnxscript)
+        torch.onnx.export(
+            model,
+            dummy,
+            str(out),
+            opset_version=opset,
+            input_names=["images"],
+            output_names=["output0"],
+            dynamic_axes={"images": {0: "batch", 2: "height", 3: "width"}, "output0": {0: "batch", 1: "anchors"}},
+            **kwargs,
+        )
+
+    meta = {
+        "names": {int(k): v for k, v in names.items()},
+        "imgsz": imgsz,
+        "stride": int(model.stride.max()),
+        "dynamic": True,
+    }
+    out.with_suffix(out.suffix + ".json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    logger.info("Export OK: %s", out)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export LP OCR weights for MODEL_BACKEND=torchscript|onnxruntime")
+    parser.add_argument("--format", choices=sorted(BACKEND_FOR_FORMAT), required=True)
+    parser.add_argument("--weights", default=settings.MODEL_PATH)
+    parser.add_argument("--out", default=None, help="default: weights with .torchscript / .onnx suffix")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--opset", type=int, default=12)
+    args = parser.parse_args()
+
+    setup_logging()
+    weights = Path(args.weights)
+    suffix = ".torchscript" if args.format == "torchscript" else ".onnx"
+    out = Path(args.out) if args.out else weights.with_suffix(suffix)
+    export(args.format, weights, out, args.imgsz, args.opset)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,21 @@
 import logging
+import time
 from pathlib import Path
+
+import numpy as np
+
+_t_import = time.perf_counter()
 import torch
 
 from app.core.config import settings
 
 logger = logging.getLogger("model_loader")
 
-_model = None
+# thời gian khởi động (ms): import torch, load weight, warm-up
+startup_timings: dict[str, float] = {"import": (time.perf_counter() - _t_import) * 1000}
 
 
-def _resolve_device() -> str:
+def resolve_device() -> str:
     if settings.DEVICE == "cpu":
         return "cpu"
     if settings.DEVICE == "cuda":
@@ -18,36 +24,109 @@ def _resolve_device() -> str:
     return "cuda" if torch.cuda.is_available() else "cpu"
 
 
-def load_model_once():
-    global _model
-    if _model is not None:
-        return _model
+def export_path_for(backend: str) -> Path:
+    if settings.EXPORT_PATH:
+        return Path(settings.EXPORT_PATH)
+    suffix = {"torchscript": ".torchscript", "onnxruntime": ".onnx"}[backend]
+    return Path(settings.MODEL_PATH).with_suffix(suffix)
 
-    model_path = Path(settings.MODEL_PATH)
-    if not model_path.exists():
-        raise FileNotFoundError(f"Model not found: {model_path}")
-
-    device = _resolve_device()
-    logger.info("Loading model: %s | device=%s", model_path, device)
 
+def load_hub_model(model_path: Path, device: str):
+    # YOLOV5_REPO là thư mục local (repo vendored) -> không cần mạng
+    repo = settings.YOLOV5_REPO
+    source = "local" if Path(repo).is_dir() else "github"
+    kwargs = {"skip_validation": True, "trust_repo": True} if source == "github" else {}
     model = torch.hub.load(
-        "ultralytics/yolov5",
+        repo,
         "custom",
         path=str(model_path),
+        source=source,
         force_reload=False,
+        **kwargs,
     )
     model.to(device)
+    return model
+
+
+def warmup(model) -> None:
+    """One dummy plate-sized inference so the first real request isn't slow."""
+    dummy = np.full((settings.WARMUP_HEIGHT, settings.WARMUP_WIDTH, 3), 114, dtype=np.uint8)
+    for _ in range(max(1, settings.WARMUP_RUNS)):
+        model([dummy])
+
+
+def share_model_memory(model) -> int:
+    """
+    Moves a loaded model's torch weights into shared memory (pre-fork serving:
+    forked workers map the same pages instead of each holding a copy).
+    Returns the bytes moved; 0 for runtimes that own their weights (onnxruntime).
+    """
+    module = model if isinstance(model, torch.nn.Module) else getattr(model, "_module", None)
+    if not isinstance(module, torch.nn.Module):
+        return 0
+    total = 0
+    for t in list(module.parameters()) + list(module.buffers()):
+        t.share_memory_()
+        total += t.numel() * t.element_size()
+    return total
+
+
+def build_model(spec, timings: dict[str, float] | None = None):
+    """Loads + warms up one model described by a registry ModelSpec."""
+    backend = spec.backend
+    device = resolve_device()
+    model_path = Path(spec.path)
+    t0 = time.perf_counter()
+
+    if backend == "torch":
+        if not model_path.exists():
+            raise FileNotFoundError(f"Model not found: {model_path}")
+        logger.info("Loading model %s: %s | backend=%s | device=%s", spec.name, model_path, backend, device)
+        model = load_hub_model(model_path, device)
+    elif backend in ("torchscript", "onnxruntime"):
+        from app.models.backends import OnnxRuntimeBackend, TorchScriptBackend
+
+        if not model_path.exists():
+            raise FileNotFoundError(f"Exported model not found: {model_path} (run python -m app.models.export)")
+        logger.info("Loading model %s: %s | backend=%s | device=%s", spec.name, model_path, backend, device)
+        if backend == "torchscript":
+            model = TorchScriptBackend(model_path, device=device)
+        else:
+            from app.core.cpu import intra_op_threads
+
+            model = OnnxRuntimeBackend(model_path, device=device, threads=intra_op_threads())
+    else:
+        raise ValueError(f"Unknown MODEL_BACKEND: {backend}")
 
     # yolo params
-    model.conf = float(settings.YOLO_CONF)
-    model.iou = float(settings.YOLO_IOU)
+    model.conf = float(spec.conf)
+    model.iou = float(spec.iou)
+    load_ms = (time.perf_counter() - t0) * 1000
+
+    warmup_ms = 0.0
+    if settings.WARMUP_ENABLED:
+        t0 = time.perf_counter()
+        warmup(model)
+        warmup_ms = (time.perf_counter() - t0) * 1000
+
+    if timings is not None:
+        timings["load"] = timings.get("load", 0.0) + load_ms
+        timings["warmup"] = timings.get("warmup", 0.0) + warmup_ms
+    logger.info("Model %s loaded OK. | load=%.0fms | warmup=%.0fms", spec.name, load_ms, warmup_ms)
+    return model
+
+
+def load_model_once():
+    """Loads every configured model (see registry) and returns the default one."""
+    from app.models.registry import get_registry
+
+    registry = get_registry()
+    registry.load_all(startup_timings)
+    logger.info("Models ready. | %s", " | ".join(f"{k}={v:.0f}ms" for k, v in startup_timings.items()))
+    return registry.model()
 
-    _model = model
-    logger.info("Model loaded OK.")
-    return _model
 
+def get_model(name: str | None = None):
+    from app.models.registry import get_registry
 
-def get_model():
-    if _model is None:
-        return load_model_once()
-    return _model
+    return get_registry().model(name)
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import asdict, dataclass
+
+from app.core.config import settings
+from app.models.loader import build_model, export_path_for
+
+logger = logging.getLogger("model_registry")
+
+_registry: "ModelRegistry | None" = None
+
+
+class UnknownModelError(KeyError):
+    pass
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    name: str
+    path: str
+    backend: str = "torch"
+    conf: float = 0.10  # YOLO conf (NMS)
+    iou: float = 0.45
+    ocr_conf: float = 0.50  # mặc định cho conf_threshold của run_ocr
+
+
+def spec_from_dict(name: str, raw: dict) -> ModelSpec:
+    return ModelSpec(
+        name=name,
+        path=str(raw["path"]),
+        backend=str(raw.get("backend", settings.MODEL_BACKEND)),
+        conf=float(raw.get("conf", settings.YOLO_CONF)),
+        iou=float(raw.get("iou", settings.YOLO_IOU)),
+        ocr_conf=float(raw.get("ocr_conf", settings.OCR_CONF_THRESHOLD)),
+    )
+
+
+def specs_from_settings() -> dict[str, ModelSpec]:
+    if settings.MODELS:
+        return {name: spec_from_dict(name, raw) for name, raw in settings.MODELS.items()}
+    # không khai báo MODELS -> 1 model "default" từ MODEL_PATH / MODEL_BACKEND như trước
+    backend = settings.MODEL_BACKEND
+    path = settings.MODEL_PATH if backend == "torch" else str(export_path_for(backend))
+    return {"default": spec_from_dict("default", {"path": path, "backend": backend})}
+
+
+class ModelRegistry:
+    """
+    Named models (e.g. "full", "nano") with their own conf/iou defaults.
+
+    swap() builds the new model first and only then replaces the dict entry,
+    so batches already running keep the model object they started with and
+    nothing in flight is dropped. Each swap bumps the model's version, which
+    callers use to keep cache entries from different weights apart.
+    """
+
+    def __init__(self, specs: dict[str, ModelSpec], default: str | None = None):
+        if not specs:
+            raise ValueError("No models configured")
+        self._specs = dict(specs)
+        self.default = default or next(iter(specs))
+        if self.default not in self._specs:
+            raise ValueError(f"DEFAULT_MODEL {self.default!r} not in {sorted(self._specs)}")
+        self._models: dict[str, object] = {}
+        self._versions = {name: 1 for name in specs}
+        self._lock = threading.Lock()
+
+    def names(self) -> list[str]:
+        return list(self._specs)
+
+    def resolve(self, name: str | None = None) -> str:
+        name = name or self.default
+        if name not in self._specs:
+            raise UnknownModelError(name)
+        return name
+
+    def spec(self, name: str | None = None) -> ModelSpec:
+        return self._specs[self.resolve(name)]
+
+    def tag(self, name: str | None = None) -> str:
+        name = self.resolve(name)
+        return f"{name}@{self._versions[name]}"
+
+    def model(self, name: str | None = None):
+        name = self.resolve(name)
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._models[name] = build_model(self._specs[name])
+        return model
+
+    def load_all(self, timings: dict[str, float] | None = None) -> None:
+        with self._lock:
+            for name, spec in self._specs.items():
+                if name not in self._models:
+                    self._models[name] = build_model(spec, timings)
+
+    def swap(self, spec: ModelSpec, load: bool = True) -> int:
+        """
+        Registers/replaces `spec`. With load=False only the spec changes
+        (process pool: workers load the new weights themselves).
+        """
+        model = build_model(spec) if load else None
+        with self._lock:
+            self._specs[spec.name] = spec
+            if model is not None:
+                self._models[spec.name] = model
+            else:
+                self._models.pop(spec.name, None)
+            self._versions[spec.name] = self._versions.get(spec.name, 0) + 1
+            version = self._versions[spec.name]
+        logger.info("Model swapped: %s -> %s (v%d)", spec.name, spec.path, version)
+        return version
+
+    def describe(self) -> list[dict]:
+        return [
+            {**asdict(spec), "version": self._versions[name], "default": name == self.default}
+            for name, spec in self._specs.items()
+        ]
+
+    def specs(self) -> dict[str, ModelSpec]:
+        return dict(self._specs)
+
+    def loaded(self) -> dict[str, object]:
+        with self._lock:
+            return dict(self._models)
+
+
+def get_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry(specs_from_settings(), settings.DEFAULT_MODEL or None)
+    return _registry
+
+
+def set_registry(registry: ModelRegistry) -> None:
+    global _registry
+    _registry = registry
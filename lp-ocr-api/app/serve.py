@@ -0,0 +1,183 @@
+"""
+Multi-worker launcher.
+
+    WORKERS=4 CPU_AFFINITY=auto python -m app.serve --host 0.0.0.0 --port 8000
+
+The parent binds the listening socket once and starts WORKERS uvicorn processes
+on it; each worker gets WORKER_INDEX (0..N-1), loads its own copy of the model
+at startup and sizes its torch thread pools to its share of the cores (see
+app.core.cpu), so N workers scale with cores instead of fighting over them.
+The kernel spreads connections over the workers. Metrics and cache are per
+worker, and POST /v1/admin/models is refused (409) since a hot swap would only
+reach one worker; change MODELS and restart instead. Plate tracking needs
+every frame of a camera in one process, so the launcher turns TRACK_ENABLED
+off when WORKERS > 1 (no plate / plate_event, format=event returns per-frame
+text); run WORKERS=1 when plate events are needed.
+
+    WORKERS=4 python -m app.serve --prefork
+
+Pre-fork (Linux): the parent loads every model once, moves the torch weights
+into shared memory, freezes the GC and then forks the workers, so they all map
+the same weight pages instead of holding WORKERS copies. The parent keeps
+torch at 1 thread and skips warm-up so no thread pool exists at fork time;
+each worker sizes its thread pool and warms up after the fork. Needs
+INFERENCE_EXECUTOR=thread, DEVICE=cpu (CUDA cannot be initialised before a
+fork) and torch / torchscript models (onnxruntime sessions would be created,
+with an all-core thread pool, before the fork).
+
+Every MEMORY_REPORT_S the parent logs RSS / unique / shared memory per worker
+(/proc/<pid>/smaps_rollup); each worker also reports its own under /health.
+
+WORKERS=1 without --prefork runs a single uvicorn server in this process, same
+as `uvicorn app.main:app`.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from multiprocessing.connection import wait
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.core.memory import memory_stats
+
+logger = logging.getLogger("serve")
+
+
+def _run_worker(index: int, workers: int, config_kwargs: dict, sockets: list, prefork: bool) -> None:
+    # process con: settings đã đọc .env khi import, ghi đè chỉ số worker
+    os.environ["WORKER_INDEX"] = str(index)
+    os.environ["WORKERS"] = str(workers)
+    settings.WORKER_INDEX = index
+    settings.WORKERS = workers
+    if prefork:
+        from app.core.cpu import configure_cpu
+        from app.models.loader import warmup
+        from app.models.registry import get_registry
+
+        configure_cpu(size_threads=True)  # bây giờ mới mở thread pool torch, sau khi fork (cha để 1 thread)
+        if settings.WARMUP_ENABLED:
+            for model in get_registry().loaded().values():
+                warmup(model)
+    uvicorn.Server(uvicorn.Config("app.main:app", **config_kwargs)).run(sockets=sockets)
+
+
+def _preload() -> None:
+    """Pre-fork: load every model in the parent and put the weights in shared memory."""
+    import torch
+
+    from app.models.loader import load_model_once, resolve_device, share_model_memory
+    from app.models.registry import get_registry, specs_from_settings
+
+    if settings.INFERENCE_EXECUTOR != "thread":
+        raise SystemExit("--prefork needs INFERENCE_EXECUTOR=thread (process workers load their own models)")
+    # CUDA khởi tạo ở cha thì worker fork ra lỗi ở lần gọi CUDA đầu tiên; share_memory_ cũng không áp dụng cho GPU
+    device = resolve_device()
+    if device != "cpu":
+        raise SystemExit(f"--prefork needs DEVICE=cpu (resolved DEVICE={settings.DEVICE} -> {device}); "
+                         "CUDA cannot be initialised before fork, run without --prefork")
+    # session onnxruntime tạo trước fork: thread pool cỡ mọi core, weight cũng không dùng chung được
+    ort = [name for name, spec in specs_from_settings().items() if spec.backend == "onnxruntime"]
+    if ort:
+        raise SystemExit(f"--prefork does not support MODEL_BACKEND=onnxruntime (models: {ort}); run without --prefork")
+    torch.set_num_threads(1)  # không tạo thread pool trước khi fork
+    warmup_enabled, settings.WARMUP_ENABLED = settings.WARMUP_ENABLED, False
+    try:
+        load_model_once()
+    finally:
+        settings.WARMUP_ENABLED = warmup_enabled
+    shared = sum(share_model_memory(m) for m in get_registry().loaded().values())
+    import app.main  # noqa: F401  (route / lib import cũng dùng chung)
+
+    gc.collect()
+    gc.freeze()  # GC của worker không chạm vào object của cha -> không copy-on-write
+    logger.info("Pre-fork: models loaded in parent | shared weights=%.1f MB | parent %s",
+                shared / 1024 / 1024, memory_stats())
+
+
+def log_memory(procs: list) -> None:
+    for i, proc in enumerate(procs):
+        stats = memory_stats(proc.pid) if proc.is_alive() else None
+        if stats is not None:
+            logger.info("worker %d pid=%d | rss=%.1fMB unique=%.1fMB shared=%.1fMB pss=%.1fMB",
+                        i, proc.pid, stats["rss_mb"], stats["unique_mb"], stats["shared_mb"], stats["pss_mb"])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run lp-ocr-api with WORKERS uvicorn processes")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WORKERS)
+    parser.add_argument("--prefork", action=argparse.BooleanOptionalAction, default=settings.PREFORK)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    workers = max(1, args.workers)
+    config_kwargs = {"host": args.host, "port": args.port, "log_level": args.log_level}
+    prefork = args.prefork
+    if prefork and "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning("--prefork needs fork(), not available here; workers load their own models")
+        prefork = False
+    if workers == 1 and not prefork:
+        settings.WORKERS = 1
+        uvicorn.run("app.main:app", **config_kwargs)
+        return 0
+
+    if settings.TRACK_ENABLED and workers > 1:
+        # tracker nằm trong từng process, kernel chia kết nối ngẫu nhiên -> track bị tách, event trùng / thiếu
+        logger.warning("WORKERS=%d: plate tracking is per process and frames of a camera are spread over "
+                       "workers, disabling TRACK_ENABLED (use WORKERS=1 for plate events)", workers)
+        os.environ["TRACK_ENABLED"] = "false"  # worker spawn đọc lại settings từ env
+        settings.TRACK_ENABLED = False
+    sock = uvicorn.Config("app.main:app", **config_kwargs).bind_socket()
+    if prefork:
+        _preload()
+    ctx = multiprocessing.get_context("fork" if prefork else "spawn")
+    procs = [
+        ctx.Process(target=_run_worker, args=(i, workers, config_kwargs, [sock], prefork), name=f"worker-{i}")
+        for i in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    logger.info("Started %d workers on %s:%d | prefork=%s | pids=%s",
+                workers, args.host, args.port, prefork, [p.pid for p in procs])
+
+    def _shutdown(signum, frame):
+        for proc in procs:
+            if proc.is_alive():
+                os.kill(proc.pid, signal.SIGINT)  # uvicorn tắt êm (chạy shutdown event)
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    interval = settings.MEMORY_REPORT_S
+    next_report = time.monotonic() + max(0.0, interval)
+    try:
+        while any(p.is_alive() for p in procs):
+            timeout = max(0.0, next_report - time.monotonic()) if interval > 0 else None
+            wait([p.sentinel for p in procs if p.is_alive()], timeout)
+            if interval > 0 and time.monotonic() >= next_report:
+                log_memory(procs)
+                next_report = time.monotonic() + interval
+    except KeyboardInterrupt:
+        _shutdown(signal.SIGINT, None)
+        for proc in procs:
+            proc.join(timeout=10)
+    finally:
+        sock.close()
+    failed = [p.name for p in procs if p.exitcode not in (0, None)]
+    if failed:
+        logger.error("Workers exited with errors: %s", failed)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.metrics import QUEUE_DEPTH, STAGE_SECONDS
+
+logger = logging.getLogger("archive")
+
+_archiver: "ImageArchiver | None" = None
+
+
+@dataclass
+class _Frame:
+    content: bytes
+    camera_id: int | None
+    captured_ns: int
+
+
+class ImageArchiver:
+    """
+    Writes uploaded frames to disk in the background.
+
+    Layout: {root}/{YYYYMMDD}/cam_{camera_id}/ocr_{camera_id}_{YYYYmmdd_HHMMSS}_{ns}.jpg
+    The nanosecond suffix plus exclusive create ("xb") means two frames from
+    the same camera in the same second never overwrite each other.
+
+    When the queue is full, policy "drop" discards the frame (counted in
+    `dropped`), policy "block" makes the caller wait for a free slot.
+    """
+
+    def __init__(self, root: Path, queue_size: int, workers: int, policy: str):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Unknown ARCHIVE_POLICY: {policy}")
+        self.root = Path(root)
+        self.policy = policy
+        self.workers = max(1, int(workers))
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: asyncio.Queue[_Frame] = asyncio.Queue(maxsize=max(1, int(queue_size)))
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="archive")
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queued": self.depth,
+        }
+
+    def start(self) -> None:
+        if not self._tasks:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._tasks = [
+                asyncio.create_task(self._worker(), name=f"archive-writer-{i}")
+                for i in range(self.workers)
+            ]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        # cố ghi nốt những ảnh còn trong queue trước khi tắt
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Archive stop timeout, %d frames not written", self.depth)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False)
+        logger.info("Archive stopped | %s", self.stats())
+
+    async def submit(self, content: bytes, camera_id: int | None) -> bool:
+        frame = _Frame(content=content, camera_id=camera_id, captured_ns=time.time_ns())
+        if self.policy == "block":
+            await self._queue.put(frame)
+            QUEUE_DEPTH.set(self.depth, queue="archive")
+            return True
+        try:
+            self._queue.put_nowait(frame)
+            QUEUE_DEPTH.set(self.depth, queue="archive")
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Archive queue full, dropped frame | camera_id=%s", camera_id)
+            return False
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            frame = await self._queue.get()
+            QUEUE_DEPTH.set(self.depth, queue="archive")
+            try:
+                path = await loop.run_in_executor(self._executor, self._write, frame)
+                self.written += 1
+                logger.debug("Image saved: %s", path)
+            except Exception as e:
+                self.failed += 1
+                logger.error("Failed to save image: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, frame: _Frame) -> Path:
+        t0 = time.perf_counter()
+        cam = frame.camera_id if frame.camera_id is not None else "none"
+        captured = datetime.fromtimestamp(frame.captured_ns / 1e9)
+        folder = self.root / captured.strftime("%Y%m%d") / f"cam_{cam}"
+        folder.mkdir(parents=True, exist_ok=True)
+
+        stem = f"ocr_{cam}_{captured.strftime('%Y%m%d_%H%M%S')}_{frame.captured_ns % 1_000_000_000:09d}"
+        path = folder / f"{stem}.jpg"
+        seq = 0
+        while True:
+            try:
+                with open(path, "xb") as f:
+                    f.write(frame.content)
+                STAGE_SECONDS.observe(time.perf_counter() - t0, stage="archive_write", camera_id=cam)
+                return path
+            except FileExistsError:
+                seq += 1
+                path = folder / f"{stem}_{seq}.jpg"
+
+
+def start_archiver() -> ImageArchiver | None:
+    global _archiver
+    if not settings.ARCHIVE_ENABLED:
+        return None
+    if _archiver is None:
+        _archiver = ImageArchiver(
+            root=Path(settings.ARCHIVE_DIR),
+            queue_size=settings.ARCHIVE_QUEUE_SIZE,
+            workers=settings.ARCHIVE_WORKERS,
+            policy=settings.ARCHIVE_POLICY,
+        )
+    _archiver.start()
+    logger.info(
+        "Archive started | dir=%s | policy=%s | queue=%d",
+        _archiver.root, _archiver.policy, settings.ARCHIVE_QUEUE_SIZE,
+    )
+    return _archiver
+
+
+async def stop_archiver() -> None:
+    global _archiver
+    if _archiver is not None:
+        await _archiver.stop()
+        _archiver = None
+
+
+def get_archiver() -> ImageArchiver | None:
+    return _archiver
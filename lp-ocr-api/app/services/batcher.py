@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+
+from app.core.config import settings
+from app.core.metrics import DEADLINE_MISSES, QUEUE_DEPTH, QUEUE_EVICTIONS
+from app.services.inference_pool import QueueFullError, get_pool
+
+logger = logging.getLogger("batcher")
+
+_batcher: "InferenceBatcher | None" = None
+
+
+class DeadlineExceededError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class Schedule:
+    """Per-request scheduling: higher priority first; deadline = time.perf_counter() value or None."""
+    priority: int = 0
+    deadline: float | None = None
+    camera_id: str = "none"  # chỉ để gắn nhãn metric
+
+    def expired(self, now: float | None = None) -> bool:
+        return self.deadline is not None and (time.perf_counter() if now is None else now) > self.deadline
+
+
+def check_deadline(sched: Schedule | None) -> None:
+    """Raise DeadlineExceededError (and count the miss) if the request is already past its deadline."""
+    if sched is not None and sched.expired():
+        DEADLINE_MISSES.inc(camera_id=sched.camera_id, outcome="dropped")
+        raise DeadlineExceededError("Deadline passed before inference")
+
+
+@dataclass(order=True)
+class _Job:
+    # heap theo (-priority, seq): priority cao trước, cùng priority thì job cũ trước
+    sort_key: tuple
+    img: object = field(compare=False)
+    conf_threshold: float | None = field(compare=False)
+    model: str = field(compare=False)
+    sched: Schedule = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class InferenceBatcher:
+    """
+    Collects images from concurrent requests and runs the model once per batch.
+    A batch is flushed when it reaches max_batch_size or when the oldest job
+    has waited max_wait_ms, whichever comes first. A batch is only formed once
+    a worker slot in the inference pool is free, so jobs keep accumulating
+    (and batches grow) while every worker is busy.
+
+    Jobs are queued per model name in a heap; a batch only ever holds one
+    model, and the model holding the highest-priority job (oldest on ties)
+    goes next. Jobs whose deadline has passed are failed with
+    DeadlineExceededError when they reach the front instead of being run, and
+    a batch never waits for more jobs past the earliest deadline in it. When
+    the queue is full, a request evicts the lowest-priority queued job if it
+    outranks it, otherwise it gets QueueFullError.
+    """
+
+    def __init__(self, max_batch_size: int, max_wait_ms: float, queue_size: int):
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.queue_size = max(1, int(queue_size))
+        self._queues: dict[str, list[_Job]] = {}
+        self._count = 0
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+
+    @property
+    def depth(self) -> int:
+        return self._count
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="inference-batcher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        for task in list(self._running):
+            task.cancel()
+        for queue in self._queues.values():
+            for job in queue:
+                if not job.future.done():
+                    job.future.set_exception(QueueFullError("Batcher stopped"))
+            queue.clear()
+        self._count = 0
+
+    async def submit(self, img, conf_threshold: float | None, model: str, sched: Schedule | None = None) -> dict:
+        sched = sched or Schedule()
+        check_deadline(sched)
+        if self._count >= self.queue_size and not self._evict_below(sched.priority):
+            raise QueueFullError(f"Inference queue full ({self.queue_size})")
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(
+            sort_key=(-sched.priority, next(self._seq)),
+            img=img, conf_threshold=conf_threshold, model=model, sched=sched, future=future,
+        )
+        heapq.heappush(self._queues.setdefault(model, []), job)
+        self._count += 1
+        QUEUE_DEPTH.set(self._count, queue="batch")
+        self._wakeup.set()
+        result = await future
+        if sched.expired():
+            DEADLINE_MISSES.inc(camera_id=sched.camera_id, outcome="late")
+        return result
+
+    def _evict_below(self, priority: int) -> bool:
+        """Fail the lowest-priority (newest on ties) queued job if it ranks below `priority`."""
+        victim = None
+        for queue in self._queues.values():
+            for job in queue:
+                if job.sched.priority < priority and (victim is None or job.sort_key > victim.sort_key):
+                    victim = job
+        if victim is None:
+            return False
+        queue = self._queues[victim.model]
+        queue.remove(victim)
+        heapq.heapify(queue)
+        self._count -= 1
+        QUEUE_EVICTIONS.inc(priority=str(victim.sched.priority))
+        if not victim.future.done():
+            victim.future.set_exception(QueueFullError(f"Evicted by a priority {priority} request"))
+        return True
+
+    def _pop(self, queue: list[_Job], now: float) -> _Job | None:
+        """Next live job of `queue`; expired ones are failed, cancelled ones skipped."""
+        while queue:
+            job = heapq.heappop(queue)
+            self._count -= 1
+            if job.future.done():
+                continue  # request đã bị huỷ (client ngắt kết nối)
+            if job.sched.expired(now):
+                DEADLINE_MISSES.inc(camera_id=job.sched.camera_id, outcome="dropped")
+                job.future.set_exception(DeadlineExceededError("Deadline passed while queued"))
+                continue
+            return job
+        return None
+
+    async def _next_batch(self) -> tuple[str, list[_Job]]:
+        while True:
+            while not self._count:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            # model có job priority cao nhất (cùng priority: cũ nhất) đi trước
+            _, model = min((q[0].sort_key, name) for name, q in self._queues.items() if q)
+            job = self._pop(self._queues[model], time.perf_counter())
+            if job is not None:
+                break
+        queue = self._queues[model]
+
+        wait_until = time.perf_counter() + self.max_wait
+        batch = [job]
+        while len(batch) < self.max_batch_size:
+            if job.sched.deadline is not None:
+                # không chờ gom thêm quá deadline sớm nhất trong batch
+                wait_until = min(wait_until, job.sched.deadline)
+            if queue:
+                nxt = self._pop(queue, time.perf_counter())
+                if nxt is not None:
+                    job = nxt
+                    batch.append(job)
+                continue
+            remaining = wait_until - time.perf_counter()
+            if remaining <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        QUEUE_DEPTH.set(self._count, queue="batch")
+        return model, batch
+
+    async def _loop(self) -> None:
+        pool = get_pool()
+        while True:
+            await pool.acquire()
+            try:
+                model, batch = await self._next_batch()
+            except BaseException:
+                pool.release()
+                raise
+            # request đã bị huỷ (client ngắt kết nối) thì bỏ qua
+            batch = [job for job in batch if not job.future.done()]
+            if not batch:
+                pool.release()
+                continue
+            task = asyncio.create_task(self._run(pool, model, batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, pool, model: str, batch: list[_Job]) -> None:
+        imgs = [job.img for job in batch]
+        thresholds = [job.conf_threshold for job in batch]
+        try:
+            results = await pool.infer(model, imgs, thresholds)
+        except Exception as e:
+            logger.exception("Batch inference failed | size=%d", len(batch))
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+        finally:
+            pool.release()
+
+        logger.debug("Batch done | model=%s | size=%d | queue=%d", model, len(batch), self._count)
+        for job, result in zip(batch, results):
+            if not job.future.done():
+                job.future.set_result(result)
+
+
+def start_batcher() -> InferenceBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = InferenceBatcher(
+            max_batch_size=settings.BATCH_MAX_SIZE,
+            max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+            queue_size=settings.BATCH_QUEUE_SIZE,
+        )
+    _batcher.start()
+    logger.info(
+        "Batcher started | max_batch=%d | max_wait_ms=%.1f | queue=%d",
+        _batcher.max_batch_size, _batcher.max_wait * 1000, _batcher.queue_size,
+    )
+    return _batcher
+
+
+async def stop_batcher() -> None:
+    global _batcher
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
+
+
+def get_batcher() -> InferenceBatcher:
+    if _batcher is None:
+        return start_batcher()
+    return _batcher
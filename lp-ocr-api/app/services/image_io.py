@@ -1,8 +1,184 @@
+import struct
+import tarfile
+import zipfile
+import zlib
+from dataclasses import dataclass
+
 import numpy as np
 import cv2
 
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+# SOF0..SOF15 trừ DHT (C4), JPG (C8), DAC (CC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class ImageTooLargeError(ValueError):
+    pass
+
+
+@dataclass
+class DecodedImage:
+    """Decoded (possibly reduced / cropped) frame plus how to map it back to the uploaded image."""
+
+    img: np.ndarray
+    scale: int = 1  # 1 pixel decode = `scale` pixel ảnh gốc
+    offset: tuple[int, int] = (0, 0)  # góc trái trên của ROI trong ảnh gốc (x, y)
+    source_size: tuple[int, int] | None = None  # (w, h) ảnh gốc
+
+    def map_result(self, result: dict) -> dict:
+        """Copy of a run_ocr result with boxes in source-image pixels."""
+        if (self.scale == 1 and self.offset == (0, 0)) or not result.get("detections"):
+            return result
+        ox, oy = self.offset
+        w, h = self.source_size or (float("inf"), float("inf"))
+        s = self.scale
+        detections = []
+        for d in result["detections"]:
+            x1, y1, x2, y2 = d["box"]
+            box = [min(x1 * s + ox, w), min(y1 * s + oy, h), min(x2 * s + ox, w), min(y2 * s + oy, h)]
+            detections.append({**d, "box": box})
+        return {**result, "detections": detections}
+
+
+def image_size(data: bytes) -> tuple[int, int] | None:
+    """(width, height) from a JPEG / PNG header without decoding, None for other formats."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        w, h = struct.unpack(">II", data[16:24])
+        return w, h
+    if data[:2] != b"\xff\xd8":
+        return None
+    i, n = 2, len(data)
+    while i + 4 <= n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # byte đệm
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            i += 2
+            continue
+        length = struct.unpack(">H", data[i + 2:i + 4])[0]
+        if marker in _JPEG_SOF:
+            if i + 9 > n:
+                return None
+            h, w = struct.unpack(">HH", data[i + 5:i + 9])
+            return w, h
+        i += 2 + length
+    return None
+
+
+def _pick_scale(long_side: int, target_size: int) -> tuple[int, int]:
+    # giảm tối đa nhưng cạnh dài vẫn >= input của model (model tự resize xuống tiếp)
+    for scale, flag in _REDUCED_FLAGS:
+        if long_side // scale >= target_size:
+            return scale, flag
+    return 1, cv2.IMREAD_COLOR
+
+
+def decode_image(
+    data: bytes,
+    target_size: int = 0,
+    roi: tuple[int, int, int, int] | None = None,
+    max_side: int = 0,
+) -> DecodedImage | None:
+    """
+    Decode an upload for OCR.
+
+    target_size: model input size; JPEGs are decoded at 1/2, 1/4 or 1/8 (libjpeg
+    DCT scaling) as long as the longest side (of the ROI, if any) stays >= it. 0 = full size.
+    roi: (x1, y1, x2, y2) in source pixels, cropped right after decode.
+    max_side: reject (ImageTooLargeError) when the header says width/height exceed it.
+    """
+    size = image_size(data)
+    if size is not None and max_side and max(size) > max_side:
+        raise ImageTooLargeError(f"Image {size[0]}x{size[1]} exceeds {max_side} px")
+
+    scale, flag = 1, cv2.IMREAD_COLOR
+    if target_size and size is not None and data[:2] == b"\xff\xd8":
+        long_side = max(size)
+        if roi is not None:
+            long_side = min(long_side, max(roi[2] - roi[0], roi[3] - roi[1]))
+        scale, flag = _pick_scale(long_side, target_size)
+
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+    if img is None:
+        return None
+    if size is None:
+        if max_side and max(img.shape[:2]) > max_side:
+            raise ImageTooLargeError(f"Image {img.shape[1]}x{img.shape[0]} exceeds {max_side} px")
+        size = (img.shape[1], img.shape[0])
+    elif (img.shape[1] >= img.shape[0]) != (size[0] >= size[1]):
+        size = (size[1], size[0])  # imdecode đã xoay theo EXIF orientation
+
+    offset = (0, 0)
+    if roi is not None:
+        x1, y1, x2, y2 = (max(0, int(v)) for v in roi)
+        crop = img[y1 // scale:-(-y2 // scale), x1 // scale:-(-x2 // scale)]
+        if crop.size:
+            # copy để ảnh gốc (full frame) được giải phóng, không giữ view
+            img = np.ascontiguousarray(crop)
+            offset = ((x1 // scale) * scale, (y1 // scale) * scale)
+    return DecodedImage(img=img, scale=scale, offset=offset, source_size=size)
+
 
 def decode_image_bytes(image_bytes: bytes):
     arr = np.frombuffer(image_bytes, dtype=np.uint8)
     img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
     return img
+
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def read_image_bundle(fileobj, max_files: int, max_file_bytes: int, max_total_bytes: int) -> list[tuple[str, bytes]]:
+    """
+    Image members of a zip/tar upload as (name, bytes), in archive order.
+    Each member is read with a bounded read (zip bomb / tar.gz nén cao không
+    được bung hết vào RAM): a member over max_file_bytes or a bundle over
+    max_total_bytes decompressed raises ValueError, as do encrypted zips and
+    unsupported compression.
+    """
+    items = []
+    total = 0
+
+    def add(name: str, size: int, stream) -> None:
+        nonlocal total
+        if len(items) >= max_files:
+            raise ValueError(f"Too many images in bundle (max {max_files})")
+        if size > max_file_bytes:
+            raise ValueError(f"{name}: larger than {max_file_bytes // (1024 * 1024)} MB")
+        with stream() as f:
+            # không tin kích thước khai báo trong header: đọc tối đa limit + 1 byte
+            content = f.read(max_file_bytes + 1)
+        if len(content) > max_file_bytes:
+            raise ValueError(f"{name}: larger than {max_file_bytes // (1024 * 1024)} MB")
+        total += len(content)
+        if total > max_total_bytes:
+            raise ValueError(f"Bundle larger than {max_total_bytes // (1024 * 1024)} MB uncompressed")
+        items.append((name, content))
+
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        try:
+            with zipfile.ZipFile(fileobj) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTS):
+                        continue
+                    add(info.filename, info.file_size, lambda: zf.open(info))
+        except (RuntimeError, NotImplementedError, zipfile.BadZipFile, zlib.error, EOFError) as e:
+            # zip có mật khẩu / kiểu nén không hỗ trợ / hỏng -> 400, không phải 500
+            raise ValueError(f"Cannot read zip bundle: {e}") from e
+        return items
+
+    fileobj.seek(0)
+    try:
+        # "r|*" đọc tuần tự, không cần seek (tar / tar.gz)
+        with tarfile.open(fileobj=fileobj, mode="r|*") as tf:
+            for member in tf:
+                if not member.isfile() or not member.name.lower().endswith(IMAGE_EXTS):
+                    continue
+                add(member.name, member.size, lambda: tf.extractfile(member))
+    except (tarfile.TarError, zlib.error, EOFError, OSError) as e:
+        raise ValueError(f"Bundle is not a zip/tar archive: {e}") from e
+    return items
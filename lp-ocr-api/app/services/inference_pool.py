@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict
+
+from app.core.config import settings
+from app.core.cpu import configure_cpu
+from app.core.metrics import INFERENCE_IN_FLIGHT, QUEUE_DEPTH
+from app.core.logging import setup_logging
+from app.models.loader import get_model, load_model_once
+from app.models.registry import ModelRegistry, ModelSpec, get_registry, set_registry
+from app.services.image_io import decode_image
+from app.services.ocr_service import run_ocr_batch
+
+logger = logging.getLogger("inference_pool")
+
+_pool: "InferencePool | None" = None
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+def _init_process_worker(specs: dict[str, dict], default: str) -> None:
+    # chạy trong process con: mỗi process giữ 1 bộ model riêng
+    setup_logging()
+    configure_cpu()
+    set_registry(ModelRegistry({name: ModelSpec(**raw) for name, raw in specs.items()}, default))
+    load_model_once()
+
+
+def _ping() -> bool:
+    return True
+
+
+def _infer(model_name: str, imgs: list, thresholds: list[float | None]) -> list[dict]:
+    return run_ocr_batch(get_model(model_name), imgs, thresholds)
+
+
+class InferencePool:
+    """
+    Runs blocking work (JPEG decode, model forward) off the asyncio event loop.
+
+    - decode: small thread pool, at most decode_queue_size calls in flight.
+    - infer: `workers` threads sharing the model registry, or `workers`
+      processes with their own copy of every model. At most `workers` batches run at once; callers
+      acquire a slot first so excess work stays queued in the batcher.
+    """
+
+    def __init__(self, kind: str, workers: int, decode_workers: int, decode_queue_size: int):
+        self.kind = kind
+        self.workers = max(1, int(workers))
+        self.decode_queue_size = max(1, int(decode_queue_size))
+        self._decode_pending = 0
+        self._slots = asyncio.Semaphore(self.workers)
+        self._decode_executor = ThreadPoolExecutor(max(1, int(decode_workers)), thread_name_prefix="decode")
+        self._executor = self._make_executor()
+
+    def _make_executor(self, specs: dict[str, ModelSpec] | None = None) -> Executor:
+        if self.kind == "process":
+            registry = get_registry()
+            specs = specs if specs is not None else registry.specs()
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+                initargs=({name: asdict(spec) for name, spec in specs.items()}, registry.default),
+            )
+        if self.kind == "thread":
+            load_model_once()
+            return ThreadPoolExecutor(self.workers, thread_name_prefix="infer")
+        raise ValueError(f"Unknown INFERENCE_EXECUTOR: {self.kind}")
+
+    def warmup(self, executor: Executor | None = None) -> None:
+        # ép ProcessPool spawn đủ process + load model trước khi nhận request
+        if self.kind == "process":
+            executor = executor or self._executor
+            for f in [executor.submit(_ping) for _ in range(self.workers)]:
+                f.result()
+
+    def swap_model(self, spec: ModelSpec) -> int:
+        """
+        Blocking: load `spec` and atomically make it the model for spec.name.
+        thread: swap in the shared registry. process: start a new set of
+        workers with the new weights, then retire the old ones; batches
+        already submitted to the old workers still complete.
+        """
+        registry = get_registry()
+        if self.kind == "thread":
+            return registry.swap(spec)
+
+        specs = registry.specs()
+        specs[spec.name] = spec
+        new_executor = self._make_executor(specs)
+        try:
+            self.warmup(new_executor)
+        except Exception:
+            new_executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        version = registry.swap(spec, load=False)
+        old_executor, self._executor = self._executor, new_executor
+        old_executor.shutdown(wait=False)
+        return version
+
+    async def run_light(self, fn, *args):
+        """Short CPU-bound helpers (decode, hashing) on the decode thread pool."""
+        if self._decode_pending >= self.decode_queue_size:
+            raise QueueFullError(f"Decode queue full ({self.decode_queue_size})")
+        self._decode_pending += 1
+        QUEUE_DEPTH.set(self._decode_pending, queue="decode")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._decode_executor, fn, *args)
+        finally:
+            self._decode_pending -= 1
+            QUEUE_DEPTH.set(self._decode_pending, queue="decode")
+
+    async def decode(self, content: bytes, roi: tuple[int, int, int, int] | None = None):
+        """DecodedImage or None; ImageTooLargeError when the header is over MAX_IMAGE_SIDE."""
+        return await self.run_light(
+            decode_image, content, settings.DECODE_TARGET_SIZE, roi, settings.MAX_IMAGE_SIDE,
+        )
+
+    async def acquire(self) -> None:
+        await self._slots.acquire()
+
+    def release(self) -> None:
+        self._slots.release()
+
+    async def infer(self, model_name: str, imgs: list, thresholds: list[float | None]) -> list[dict]:
+        """Caller must hold a slot (see acquire/release)."""
+        loop = asyncio.get_running_loop()
+        INFERENCE_IN_FLIGHT.inc()
+        try:
+            return await loop.run_in_executor(self._executor, _infer, model_name, imgs, thresholds)
+        finally:
+            INFERENCE_IN_FLIGHT.dec()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._decode_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def start_pool() -> InferencePool:
+    global _pool
+    if _pool is None:
+        _pool = InferencePool(
+            kind=settings.INFERENCE_EXECUTOR,
+            workers=settings.INFERENCE_WORKERS,
+            decode_workers=settings.DECODE_WORKERS,
+            decode_queue_size=settings.DECODE_QUEUE_SIZE,
+        )
+        _pool.warmup()
+        logger.info(
+            "Inference pool started | executor=%s | workers=%d | decode_workers=%d",
+            _pool.kind, _pool.workers, settings.DECODE_WORKERS,
+        )
+    return _pool
+
+
+def stop_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+def get_pool() -> InferencePool:
+    if _pool is None:
+        return start_pool()
+    return _pool
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import logging
 import time
-import pandas as pd
+from functools import partial
+
+import numpy as np
 
 from app.core.config import settings
 
@@ -15,24 +17,105 @@ def run_ocr(model, img, conf_threshold: float | None = None) -> dict:
       {
         "text": str,
         "detections": [{"char":..., "conf":..., "box":[x1,y1,x2,y2], "row_id": int}],
-        "latency_ms": int
+        "latency_ms": int,
+        "timings_ms": {"forward": float, "postprocess": float}
       }
     """
+    return run_ocr_batch(model, [img], [conf_threshold])[0]
+
+
+def run_ocr_batch(model, imgs: list, conf_thresholds: list[float | None] | None = None) -> list[dict]:
+    """
+    Runs the model once on a list of images.
+    Returns one run_ocr-style dict per image, in input order.
+    """
     t0 = time.time()
-    conf_thr = float(conf_threshold if conf_threshold is not None else settings.OCR_CONF_THRESHOLD)
-    logger.debug(f"🔍 Running OCR | conf_threshold={conf_thr:.2f}")
+    if conf_thresholds is None:
+        conf_thresholds = [None] * len(imgs)
+    logger.debug(f"🔍 Running OCR batch | size={len(imgs)}")
+
+    t_fwd = time.perf_counter()
+    results = model(imgs)
+    forward_ms = (time.perf_counter() - t_fwd) * 1000
+    if settings.OCR_POSTPROCESS == "pandas" and hasattr(results, "pandas"):
+        frames = results.pandas().xyxy  # list pandas DataFrame, 1 cái / ảnh
+        postprocess = _postprocess_pandas
+    else:
+        frames = [_to_numpy(t) for t in results.xyxy]
+        postprocess = partial(_postprocess, names=results.names)
+
+    out = []
+    for det, conf_threshold in zip(frames, conf_thresholds):
+        conf_thr = float(conf_threshold if conf_threshold is not None else settings.OCR_CONF_THRESHOLD)
+        t_pp = time.perf_counter()
+        result = postprocess(det, conf_thr=conf_thr, t0=t0)
+        result["timings_ms"] = {"forward": forward_ms, "postprocess": (time.perf_counter() - t_pp) * 1000}
+        out.append(result)
+    return out
+
+
+def _to_numpy(t) -> np.ndarray:
+    # tensor (N, 6) [x1, y1, x2, y2, conf, cls]; float64 giống .tolist() của bản pandas
+    if hasattr(t, "cpu"):
+        t = t.cpu().numpy()
+    return np.asarray(t, dtype=np.float64).reshape(-1, 6)
+
+
+def _empty(reason: str, t0: float) -> dict:
+    return {
+        "text": "",
+        "detections": [],
+        "reason": reason,
+        "latency_ms": int((time.time() - t0) * 1000),
+    }
+
+
+def _postprocess(det: np.ndarray, names, conf_thr: float, t0: float) -> dict:
+    n = len(det)
+    if n == 0:
+        logger.warning(f"⚠️  No detections found")
+        return _empty("no_detections", t0)
+
+    x1, y1, x2, y2, conf, cls = det.T
+    xc = (x1 + x2) / 2
+    yc = (y1 + y2) / 2
+
+    # tách dòng theo median height
+    h_med = float(np.median(y2 - y1))
+    y_thresh = h_med * 0.35 if h_med > 0 else 10.0
+
+    # sort theo (yc, xc), sang dòng mới khi yc nhảy quá y_thresh so với box trước
+    order = np.lexsort((xc, yc))
+    rows_sorted = np.zeros(n, dtype=np.int64)
+    np.cumsum(np.abs(np.diff(yc[order])) > y_thresh, out=rows_sorted[1:])
+    row_id = np.empty(n, dtype=np.int64)
+    row_id[order] = rows_sorted
+
+    # sort lại theo (row_id, xc); lexsort stable nên tie giữ thứ tự (yc, xc) như pandas
+    order = order[np.lexsort((xc[order], row_id[order]))]
+    keep = order[conf[order] >= conf_thr]
+    if keep.size == 0:
+        logger.warning(f"⚠️  All {n} detections filtered by confidence threshold")
+        return _empty("all_filtered_by_conf", t0)
+
+    chars = [str(names[c]) for c in cls[keep].astype(np.int64).tolist()]
+    detections = [
+        {"char": ch, "conf": cf, "box": box, "row_id": rid}
+        for ch, cf, box, rid in zip(chars, conf[keep].tolist(), det[keep, :4].tolist(), row_id[keep].tolist())
+    ]
+
+    return {
+        "text": "".join(chars),
+        "detections": detections,
+        "latency_ms": int((time.time() - t0) * 1000),
+    }
 
-    results = model(img)
-    det = results.pandas().xyxy[0]  # pandas DataFrame
 
+def _postprocess_pandas(det, conf_thr: float, t0: float) -> dict:
+    """Legacy pandas path (OCR_POSTPROCESS=pandas), kept for A/B checks."""
     if det is None or len(det) == 0:
         logger.warning(f"⚠️  No detections found")
-        return {
-            "text": "",
-            "detections": [],
-            "reason": "no_detections",
-            "latency_ms": int((time.time() - t0) * 1000),
-        }
+        return _empty("no_detections", t0)
 
     det = det.copy()
     det["xc"] = (det["xmin"] + det["xmax"]) / 2
@@ -63,12 +146,7 @@ def run_ocr(model, img, conf_threshold: float | None = None) -> dict:
     det_filtered = det[det["confidence"] >= conf_thr].copy()
     if len(det_filtered) == 0:
         logger.warning(f"⚠️  All {len(det)} detections filtered by confidence threshold")
-        return {
-            "text": "",
-            "detections": [],
-            "reason": "all_filtered_by_conf",
-            "latency_ms": int((time.time() - t0) * 1000),
-        }
+        return _empty("all_filtered_by_conf", t0)
 
     text = ""
     detections = []
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger("plate_locator")
+
+_locator: "PlateLocator | None" = None
+
+
+def plate_box(detections: list[dict]) -> tuple[float, float, float, float] | None:
+    """Union of detection boxes (source pixels), None when there are none."""
+    if not detections:
+        return None
+    boxes = [d["box"] for d in detections]
+    return (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+
+
+class PlateLocator:
+    """
+    First stage of the two-stage pipeline: where is the plate in this frame?
+
+    "cached": reuse the plate box found in the camera's previous frame (for `ttl_s`).
+    "detector": same cache, and on a miss run `detector` (a model from the
+    registry, e.g. a plate detector or the nano char model) on the full frame.
+
+    The crop window is the plate box plus `margin`, grown to at least `window`
+    pixels, so the char model reads it at native resolution instead of the full
+    frame downscaled to its input size.
+    """
+
+    def __init__(self, mode: str, detector: str, margin: float, ttl_s: float, window: int):
+        if mode not in ("cached", "detector"):
+            raise ValueError(f"Unknown LOCATE_MODE: {mode}")
+        if mode == "detector" and not detector:
+            raise ValueError("LOCATE_MODE=detector requires LOCATE_DETECTOR (a model name from MODELS)")
+        self.mode = mode
+        self.detector = detector if mode == "detector" else ""
+        self.margin = float(margin)
+        self.ttl = float(ttl_s)
+        self.window_size = int(window)
+        self.hits = 0
+        self.misses = 0
+        self._boxes: dict[str, tuple[float, tuple[int, int, int, int]]] = {}
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "cameras": len(self._boxes), "hits": self.hits, "misses": self.misses}
+
+    def window(self, box: tuple, frame_size: tuple[int, int]) -> tuple[int, int, int, int]:
+        x1, y1, x2, y2 = box
+        fw, fh = frame_size
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        w = min(fw, max(self.window_size, (x2 - x1) * (1 + 2 * self.margin)))
+        h = min(fh, max(self.window_size, (y2 - y1) * (1 + 2 * self.margin)))
+        left = int(min(max(0.0, cx - w / 2), fw - w))
+        top = int(min(max(0.0, cy - h / 2), fh - h))
+        return left, top, int(left + w), int(top + h)
+
+    def cached(self, cam: str) -> tuple[int, int, int, int] | None:
+        entry = self._boxes.get(cam)
+        if entry is None or entry[0] < time.monotonic():
+            self._boxes.pop(cam, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def remember(self, cam: str, box: tuple, frame_size: tuple[int, int]) -> None:
+        if cam == "none":
+            return  # upload không có camera_id: không biết frame sau là của ai
+        self._boxes[cam] = (time.monotonic() + self.ttl, self.window(box, frame_size))
+
+    def forget(self, cam: str) -> None:
+        self._boxes.pop(cam, None)
+
+
+def get_locator() -> PlateLocator | None:
+    global _locator
+    if settings.LOCATE_MODE == "off":
+        return None
+    if _locator is None:
+        _locator = PlateLocator(
+            mode=settings.LOCATE_MODE,
+            detector=settings.LOCATE_DETECTOR,
+            margin=settings.LOCATE_MARGIN,
+            ttl_s=settings.LOCATE_TTL_S,
+            window=settings.DECODE_TARGET_SIZE or 640,
+        )
+        logger.info("Plate locator enabled | %s", _locator.stats())
+    return _locator
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from difflib import SequenceMatcher
+
+from app.core.config import settings
+from app.core.metrics import PLATE_EVENTS
+
+logger = logging.getLogger("plate_tracker")
+
+_tracker: "PlateTracker | None" = None
+
+
+@dataclass
+class _Track:
+    track_id: int
+    first_seen: str
+    last_seen: float
+    frames: deque  # mỗi frame: [(char, conf), ...] theo thứ tự đọc
+    plate: str = ""
+    conf: float = 0.0
+    emitted: bool = False
+    seen: int = 0
+
+
+def vote(frames) -> tuple[str, float]:
+    """
+    Conf-weighted character voting over frames.
+    Length is voted first (sum of conf per length), then each position among frames
+    of that length. Position confidence = winning weight / frames voting, so a
+    position where frames disagree scores lower even if each read was confident.
+    """
+    by_len: dict[int, float] = defaultdict(float)
+    for chars in frames:
+        by_len[len(chars)] += sum(c for _, c in chars)
+    length = max(by_len, key=by_len.get)
+    same = [chars for chars in frames if len(chars) == length]
+
+    plate, confs = [], []
+    for pos in range(length):
+        scores: dict[str, float] = defaultdict(float)
+        for chars in same:
+            ch, c = chars[pos]
+            scores[ch] += c
+        ch, weight = max(scores.items(), key=lambda kv: kv[1])
+        plate.append(ch)
+        confs.append(weight / len(same))
+    return "".join(plate), (sum(confs) / length if length else 0.0)
+
+
+class PlateTracker:
+    """
+    Per-camera temporal consensus. Frames of one vehicle are merged into a track
+    until the camera sees nothing for `expiry_s` or reads a clearly different plate;
+    each track emits one plate event once it has `min_frames` frames and the
+    consensus confidence reaches `min_conf`.
+    """
+
+    def __init__(self, window: int, expiry_s: float, min_frames: int, min_conf: float, new_plate_ratio: float):
+        self.window = max(1, int(window))
+        self.expiry_s = float(expiry_s)
+        self.min_frames = max(1, int(min_frames))
+        self.min_conf = float(min_conf)
+        self.new_plate_ratio = float(new_plate_ratio)
+        self.events = 0
+        self._next_id = 0
+        self._tracks: dict[str, _Track] = {}
+
+    def stats(self) -> dict:
+        return {"tracks": len(self._tracks), "events": self.events}
+
+    def _new_track(self, now: float) -> _Track:
+        self._next_id += 1
+        return _Track(
+            track_id=self._next_id,
+            first_seen=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            last_seen=now,
+            frames=deque(maxlen=self.window),
+        )
+
+    def update(self, camera_id: str, detections: list[dict], now: float | None = None) -> dict:
+        """Add one frame's detections; returns plate, plate_conf and plate_event (or None)."""
+        now = time.monotonic() if now is None else now
+        track = self._tracks.get(camera_id)
+        if track is not None and now - track.last_seen > self.expiry_s:
+            track = None  # xe trước đã đi
+        chars = [(d["char"], float(d["conf"])) for d in detections]
+        if not chars:
+            if track is None:
+                self._tracks.pop(camera_id, None)
+                return {"plate": None, "plate_conf": None, "plate_event": None}
+            return {"plate": track.plate or None, "plate_conf": round(track.conf, 4), "plate_event": None}
+
+        text = "".join(ch for ch, _ in chars)
+        if track is not None and track.plate and SequenceMatcher(None, track.plate, text).ratio() < self.new_plate_ratio:
+            track = None  # biển khác hẳn = xe mới
+        if track is None:
+            track = self._tracks[camera_id] = self._new_track(now)
+
+        track.frames.append(chars)
+        track.seen += 1
+        track.last_seen = now
+        track.plate, track.conf = vote(track.frames)
+
+        event = None
+        if not track.emitted and track.seen >= self.min_frames and track.conf >= self.min_conf:
+            track.emitted = True
+            self.events += 1
+            PLATE_EVENTS.inc(camera_id=camera_id)
+            event = {
+                "event_id": track.track_id,
+                "camera_id": camera_id,
+                "plate": track.plate,
+                "conf": round(track.conf, 4),
+                "frames": track.seen,
+                "first_seen": track.first_seen,
+            }
+            logger.info("Plate event | camera=%s | plate=%s | conf=%.3f | frames=%d",
+                        camera_id, track.plate, track.conf, track.seen)
+        return {"plate": track.plate, "plate_conf": round(track.conf, 4), "plate_event": event}
+
+
+def get_tracker() -> PlateTracker | None:
+    global _tracker
+    if not settings.TRACK_ENABLED:
+        return None
+    if _tracker is None:
+        _tracker = PlateTracker(
+            window=settings.TRACK_WINDOW,
+            expiry_s=settings.TRACK_EXPIRY_S,
+            min_frames=settings.TRACK_MIN_FRAMES,
+            min_conf=settings.TRACK_MIN_CONF,
+            new_plate_ratio=settings.TRACK_NEW_PLATE_RATIO,
+        )
+    return _tracker
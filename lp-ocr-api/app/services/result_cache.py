@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger("result_cache")
+
+_cache: "OCRResultCache | None" = None
+
+
+def content_key(content: bytes, conf_thr: float, model_tag: str, roi: tuple | None = None) -> tuple:
+    return ("b", hashlib.blake2b(content, digest_size=16).digest(), round(conf_thr, 4), model_tag, roi)
+
+
+def perceptual_key(
+    img: np.ndarray, conf_thr: float, model_tag: str, roi: tuple | None = None, size: int = 12,
+) -> tuple:
+    """
+    dHash of `img` on a (size+1) x size grid: JPEG re-encodes of one static scene
+    give the same hash. `img` is the decoded ROI / plate crop when one is set, so
+    the hash covers the plate at a usable resolution; on a full frame a different
+    car of similar shape can still collide (hence the short CACHE_PHASH_TTL_S).
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return ("p", bits.tobytes(), round(conf_thr, 4), model_tag, roi)
+
+
+class OCRResultCache:
+    """
+    LRU + TTL cache of run_ocr results.
+    Entries are shared between requests: treat returned dicts as read-only.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, mode: str):
+        if mode not in ("exact", "phash"):
+            raise ValueError(f"Unknown CACHE_MODE: {mode}")
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_s)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def get(self, key: tuple) -> dict | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        CACHE_LOOKUPS.inc(result="hit")
+        return result
+
+    def put(self, key: tuple, result: dict) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, result)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+def get_cache() -> OCRResultCache | None:
+    global _cache
+    if not settings.CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = OCRResultCache(
+            max_entries=settings.CACHE_MAX_ENTRIES,
+            # phash có thể nhầm xe khác cùng khung cảnh -> TTL ngắn
+            ttl_s=settings.CACHE_PHASH_TTL_S if settings.CACHE_MODE == "phash" else settings.CACHE_TTL_S,
+            mode=settings.CACHE_MODE,
+        )
+        logger.info("Result cache enabled | %s", _cache.stats())
+    return _cache
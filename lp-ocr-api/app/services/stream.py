@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class StreamFrame:
+    seq: int
+    content: bytes
+    received_at: float = field(default_factory=time.perf_counter)
+
+
+class LatestFrameMailbox:
+    """
+    Single-slot mailbox for one camera on a /v1/ocr/stream connection.
+
+    put() overwrites a frame that has not been picked up yet, so when inference
+    falls behind the camera's newest frame is the next one processed and the
+    stale ones are dropped (counted in `dropped`).
+    """
+
+    def __init__(self):
+        self._frame: StreamFrame | None = None
+        self._event = asyncio.Event()
+        self.dropped = 0
+
+    def put(self, frame: StreamFrame) -> StreamFrame | None:
+        stale, self._frame = self._frame, frame
+        if stale is not None:
+            self.dropped += 1
+        self._event.set()
+        return stale
+
+    async def get(self) -> StreamFrame:
+        while self._frame is None:
+            self._event.clear()
+            await self._event.wait()
+        frame, self._frame = self._frame, None
+        return frame
@@ -0,0 +1,159 @@
+"""
+Payload corpus for the load generator: every image is read / encoded once, and
+every request body (raw JPEG or a complete multipart/form-data body) is built
+once, so sending a request costs no disk I/O, no encoding and no form building.
+
+    # đóng gói 1 lần: ảnh thật + frame tổng hợp -> 1 file
+    python -m bench.corpus --images ../images --synthetic 0.5 --count 512 --out corpus.bin
+    # loadgen mmap file đó thay vì đọc / encode lại mỗi lần chạy
+    python -m bench.loadgen --corpus corpus.bin ...
+
+Packed file: MAGIC, 8-byte little-endian index length, JSON index
+[{"name", "offset", "length"}], then the payloads back to back. Opening it mmaps
+the file and hands out memoryview slices (no copy).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import random
+import struct
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+MAGIC = b"LPCORP1\n"
+BOUNDARY = "lpocrbench7f3a9c2e"
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+USER_AGENTS = [
+    "Hikvision/1.0 (Camera)",
+    "Dahua/2.0",
+    "CameraClient/1.0",
+    "ESP32-CAM/1.0",
+]
+
+
+def synthetic_frame(rng: random.Random, width: int, height: int) -> bytes:
+    """Random background + a plate-like white box with characters, JPEG encoded."""
+    img = np.full((height, width, 3), rng.randint(30, 200), dtype=np.uint8)
+    noise = np.random.default_rng(rng.randint(0, 2**31)).integers(0, 40, (height, width, 1), dtype=np.uint8)
+    img = cv2.add(img, np.repeat(noise, 3, axis=2))
+    pw, ph = width // 4, height // 8
+    x, y = rng.randint(0, width - pw), rng.randint(0, height - ph)
+    cv2.rectangle(img, (x, y), (x + pw, y + ph), (235, 235, 235), -1)
+    plate = "".join(rng.choice("0123456789ABCDEFGHKLMNPSTUVXYZ") for _ in range(8))
+    cv2.putText(img, plate, (x + 4, y + ph - 6), cv2.FONT_HERSHEY_SIMPLEX, ph / 40, (20, 20, 20), 2)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    return buf.tobytes()
+
+
+def multipart_body(name: str, content, field: str = "file") -> bytes:
+    """Complete multipart/form-data body with one file field (boundary = BOUNDARY)."""
+    head = (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{name}"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode()
+    return b"".join((head, content, f"\r\n--{BOUNDARY}--\r\n".encode()))
+
+
+class Corpus:
+    def __init__(self, items: list[tuple[str, bytes | memoryview]], mm: mmap.mmap | None = None):
+        self.items = items
+        self._mm = mm  # giữ mmap sống khi còn memoryview trỏ vào
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(content) for _, content in self.items)
+
+    @classmethod
+    def build(cls, images: Path | None, synthetic: float, count: int,
+              size: tuple[int, int], seed: int = 0) -> "Corpus":
+        """
+        `count` payloads: real images from `images` (each file read once) mixed with
+        distinct synthetic frames. `synthetic` = fraction of synthetic frames
+        (1.0 when there are no real images).
+        """
+        rng = random.Random(seed)
+        real = []
+        if images is not None and images.is_dir():
+            for p in sorted(images.iterdir()):
+                if p.suffix.lower() in IMAGE_EXTS:
+                    real.append((p.name, p.read_bytes()))
+        n_syn = int(round(count * synthetic)) if real else count
+        items = [rng.choice(real) for _ in range(count - n_syn)]
+        items += [(f"synthetic_{i}.jpg", synthetic_frame(rng, *size)) for i in range(n_syn)]
+        rng.shuffle(items)
+        return cls(items)
+
+    def pack(self, path: Path) -> None:
+        index, offset = [], 0
+        for name, content in self.items:
+            index.append({"name": name, "offset": offset, "length": len(content)})
+            offset += len(content)
+        raw_index = json.dumps(index).encode()
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(raw_index)))
+            f.write(raw_index)
+            for _, content in self.items:
+                f.write(content)
+
+    @classmethod
+    def open(cls, path: Path) -> "Corpus":
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(MAGIC)] != MAGIC:
+            mm.close()
+            raise ValueError(f"{path} is not a packed corpus")
+        pos = len(MAGIC)
+        (n,) = struct.unpack_from("<Q", mm, pos)
+        pos += 8
+        index = json.loads(mm[pos:pos + n])
+        base = pos + n
+        view = memoryview(mm)
+        items = [(e["name"], view[base + e["offset"]:base + e["offset"] + e["length"]]) for e in index]
+        return cls(items, mm)
+
+    def requests(self, raw: bool) -> list[tuple[bytes | memoryview, dict]]:
+        """
+        Prebuilt (body, headers) per payload. Raw bodies are the payload itself
+        (mmap slice when opened from a packed file); multipart bodies are built once.
+        """
+        out = []
+        for i, (name, content) in enumerate(self.items):
+            headers = {"User-Agent": USER_AGENTS[i % len(USER_AGENTS)]}
+            if raw:
+                headers["Content-Type"] = "image/jpeg"
+                out.append((content, headers))
+            else:
+                headers["Content-Type"] = f"multipart/form-data; boundary={BOUNDARY}"
+                out.append((multipart_body(name, content), headers))
+        return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pack a payload corpus for bench.loadgen")
+    parser.add_argument("--images", default="../images", help="thư mục ảnh thật")
+    parser.add_argument("--synthetic", type=float, default=0.0, help="tỉ lệ frame tổng hợp (0..1)")
+    parser.add_argument("--synthetic-size", default="1280x720")
+    parser.add_argument("--count", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args(argv)
+
+    w, h = (int(v) for v in args.synthetic_size.lower().split("x"))
+    corpus = Corpus.build(Path(args.images), args.synthetic, args.count, (w, h), args.seed)
+    corpus.pack(Path(args.out))
+    print(f"{len(corpus)} payloads | {corpus.nbytes / 1024 / 1024:.1f} MB -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+HdrHistogram-style latency histogram (no hdrh dependency).
+
+Values are recorded in microseconds into log-linear buckets: each power-of-two
+range is split into 2**SUB_BITS linear sub-buckets, so any recorded value is
+reproduced within ~0.1% (3 significant digits), from 1 us up to hours, with a
+fixed small memory footprint. Histograms from several workers merge exactly.
+"""
+from __future__ import annotations
+
+import math
+
+SUB_BITS = 10  # 1024 sub-bucket / lũy thừa 2 -> sai số tương đối <= 1/1024
+SUB_COUNT = 1 << SUB_BITS
+
+
+def _index(value: int) -> int:
+    if value < SUB_COUNT:
+        return value
+    exp = value.bit_length() - SUB_BITS - 1
+    return (exp + 1) * SUB_COUNT + ((value >> exp) - SUB_COUNT)
+
+
+def _value_at(index: int) -> int:
+    """Highest value that maps to `index` (HdrHistogram reports bucket upper bounds)."""
+    if index < SUB_COUNT:
+        return index
+    exp = index // SUB_COUNT - 1
+    sub = index % SUB_COUNT + SUB_COUNT
+    return ((sub + 1) << exp) - 1
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us = 0
+        self.max_us = 0
+
+    def record(self, seconds: float) -> None:
+        us = max(0, int(round(seconds * 1_000_000)))
+        i = _index(us)
+        self.counts[i] = self.counts.get(i, 0) + 1
+        if self.count == 0 or us < self.min_us:
+            self.min_us = us
+        if us > self.max_us:
+            self.max_us = us
+        self.count += 1
+        self.total_us += us
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        for i, n in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + n
+        if other.count:
+            self.min_us = other.min_us if self.count == 0 else min(self.min_us, other.min_us)
+            self.max_us = max(self.max_us, other.max_us)
+        self.count += other.count
+        self.total_us += other.total_us
+        return self
+
+    def percentile(self, q: float) -> float:
+        """q in [0, 100] -> milliseconds."""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= rank:
+                return min(_value_at(i), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_us / self.count / 1000, 3) if self.count else 0.0,
+            "min_ms": self.min_us / 1000,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "p999_ms": self.percentile(99.9),
+            "max_ms": self.max_us / 1000,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "counts": {str(i): n for i, n in self.counts.items()},
+            "count": self.count,
+            "total_us": self.total_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "LatencyHistogram":
+        h = cls()
+        h.counts = {int(i): int(n) for i, n in raw["counts"].items()}
+        h.count = int(raw["count"])
+        h.total_us = int(raw["total_us"])
+        h.min_us = int(raw["min_us"])
+        h.max_us = int(raw["max_us"])
+        return h
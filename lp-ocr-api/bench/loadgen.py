@@ -0,0 +1,465 @@
+"""
+Load generator / benchmark for the OCR API (grown out of day7/spam.py).
+
+    # closed loop: ramp concurrency, 20 s per step, 10 s warm-up
+    python -m bench.loadgen --url http://127.0.0.1:8000/v1/ocr --concurrency 1,2,4,8,16 --duration 20
+
+    # open loop: constant arrival rate (req/s), latency measured from the scheduled send time
+    python -m bench.loadgen --mode open --rate 5,10,20,40 --duration 30
+
+    # 8 process, 200 camera giả lập (camera_id + User-Agent riêng), như giờ cao điểm
+    python -m bench.loadgen --workers 8 --cameras 200 --mode open --rate 100,200,400 --raw
+
+    # lưu kết quả, so với baseline (exit 1 khi throughput giảm / p99 tăng quá --tolerance)
+    python -m bench.loadgen --out run.json --csv run.csv --baseline baseline.json
+
+Request bodies come prebuilt from bench.corpus and repeat, so with CACHE_ENABLED
+most requests after the first round are cache hits; for model throughput run the
+server with CACHE_ENABLED=false.
+
+Needs aiohttp (client side only, not in requirements.txt).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import itertools
+import multiprocessing as mp
+import queue
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from bench.corpus import USER_AGENTS, Corpus
+from bench.histogram import LatencyHistogram
+
+# ---- one step ----
+
+@dataclass
+class StepStats:
+    mode: str
+    level: float  # concurrency (closed) hoặc req/s (open)
+    hist: LatencyHistogram = field(default_factory=LatencyHistogram)
+    statuses: dict[str, int] = field(default_factory=dict)
+    started: float = 0.0
+    elapsed: float = 0.0
+    skipped: int = 0  # open loop: không gửi được vì chạm --max-inflight
+    ticked_ok: int = 0  # đã báo live tới đâu
+    ticked_err: int = 0
+
+    def merge(self, other: "StepStats") -> "StepStats":
+        self.hist.merge(other.hist)
+        for status, n in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + n
+        self.skipped += other.skipped
+        self.elapsed = max(self.elapsed, other.elapsed)
+        return self
+
+    def to_dict(self) -> dict:
+        return {"hist": self.hist.to_dict(), "statuses": self.statuses, "skipped": self.skipped, "elapsed": self.elapsed}
+
+    @classmethod
+    def from_dict(cls, mode: str, level: float, raw: dict) -> "StepStats":
+        return cls(mode=mode, level=level, hist=LatencyHistogram.from_dict(raw["hist"]),
+                   statuses=dict(raw["statuses"]), skipped=raw["skipped"], elapsed=raw["elapsed"])
+
+    def add_status(self, status: str) -> None:
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def report(self) -> dict:
+        ok = self.statuses.get("200", 0)
+        total = sum(self.statuses.values())
+        return {
+            "mode": self.mode,
+            "level": self.level,
+            "duration_s": round(self.elapsed, 3),
+            "requests": total,
+            "ok": ok,
+            "errors": total - ok,
+            "skipped": self.skipped,
+            "throughput_rps": round(ok / self.elapsed, 3) if self.elapsed else 0.0,
+            "statuses": dict(sorted(self.statuses.items())),
+            **self.hist.summary(),
+        }
+
+
+def worker_targets(url: str, cameras: int, camera_start: int, worker: int, workers: int) -> list[tuple[str, str | None]]:
+    """
+    (url, User-Agent) pairs for one worker: cameras are dealt round-robin so every
+    worker holds distinct camera_id values, each with its own User-Agent.
+    User-Agent None = keep the corpus one.
+    """
+    if cameras <= 0:
+        return [(url, f"LPBench/1.0 (worker {worker})" if workers > 1 else None)]
+    sep = "&" if "?" in url else "?"
+    cams = [camera_start + i for i in range(cameras) if i % workers == worker]
+    targets = [(f"{url}{sep}camera_id={cam}", f"{USER_AGENTS[cam % len(USER_AGENTS)]} cam-{cam}") for cam in cams]
+    return targets or [(url, f"LPBench/1.0 (worker {worker})")]
+
+
+class LoadGenerator:
+    def __init__(self, session, targets: list[tuple[str, str | None]],
+                 requests: list[tuple[bytes | memoryview, dict]], seed: int):
+        self.session = session
+        self.rng = random.Random(seed)
+        # body + header dựng sẵn, mỗi request chỉ lấy phần tử kế tiếp
+        order = list(range(len(requests)))
+        self.rng.shuffle(order)
+        self._next = itertools.cycle([requests[i] for i in order]).__next__
+        self._target = itertools.cycle(targets).__next__
+
+    async def send(self, stats: StepStats | None, started: float | None = None) -> None:
+        """One request; latency counted from `started` (open loop: scheduled time)."""
+        t0 = time.perf_counter() if started is None else started
+        try:
+            body, headers = self._next()
+            url, user_agent = self._target()
+            if user_agent:
+                headers = {**headers, "User-Agent": user_agent}
+            async with self.session.post(url, data=body, headers=headers) as resp:
+                await resp.read()
+                status = str(resp.status)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status = f"error:{type(e).__name__}"
+        if stats is not None:
+            stats.hist.record(time.perf_counter() - t0)
+            stats.add_status(status)
+
+    async def closed_loop(self, concurrency: int, duration: float, stats: StepStats | None) -> None:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                await self.send(stats)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def open_loop(self, rate: float, duration: float, stats: StepStats | None,
+                        max_inflight: int, poisson: bool) -> None:
+        # gửi theo lịch cố định, không chờ response (tránh coordinated omission)
+        start = time.perf_counter()
+        deadline = start + duration
+        tasks: set[asyncio.Task] = set()
+        next_at = start
+        while next_at < deadline:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(tasks) >= max_inflight:
+                if stats is not None:
+                    stats.skipped += 1
+            else:
+                task = asyncio.create_task(self.send(stats, started=next_at))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            next_at += self.rng.expovariate(rate) if poisson else 1.0 / rate
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def run_step(self, mode: str, level: float, duration: float, args, record: bool,
+                       tick=None) -> StepStats | None:
+        stats = StepStats(mode=mode, level=level) if record else None
+        ticker = asyncio.create_task(self._ticker(stats, tick)) if stats is not None and tick else None
+        t0 = time.perf_counter()
+        try:
+            if mode == "closed":
+                await self.closed_loop(int(level), duration, stats)
+            else:
+                await self.open_loop(level, duration, stats, args.max_inflight, args.poisson)
+        finally:
+            if ticker is not None:
+                ticker.cancel()
+        if stats is not None:
+            stats.started = t0
+            stats.elapsed = time.perf_counter() - t0
+            if tick:
+                self._tick(stats, tick)
+        return stats
+
+    def _tick(self, stats: StepStats, tick) -> None:
+        ok = stats.statuses.get("200", 0)
+        done = sum(stats.statuses.values())
+        tick(ok - stats.ticked_ok, (done - ok) - stats.ticked_err)
+        stats.ticked_ok, stats.ticked_err = ok, done - ok
+
+    async def _ticker(self, stats: StepStats, tick) -> None:
+        while True:
+            await asyncio.sleep(1.0)
+            self._tick(stats, tick)
+
+
+# ---- output ----
+
+COLUMNS = ("mode", "level", "requests", "ok", "errors", "skipped", "throughput_rps",
+           "mean_ms", "p50_ms", "p95_ms", "p99_ms", "p999_ms", "max_ms")
+
+
+def print_row(row: dict) -> None:
+    print(
+        f"{row['mode']:>6} {row['level']:>7g} | {row['requests']:>6} req {row['errors']:>4} err"
+        f" | {row['throughput_rps']:>8.2f} req/s"
+        f" | p50 {row['p50_ms']:>8.1f} p95 {row['p95_ms']:>8.1f} p99 {row['p99_ms']:>8.1f}"
+        f" p999 {row['p999_ms']:>8.1f} max {row['max_ms']:>8.1f} ms"
+        + (f" | skipped {row['skipped']}" if row["skipped"] else "")
+    )
+
+
+def write_csv(path: Path, rows: list[dict]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def compare(rows: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Regressions vs baseline steps with the same (mode, level)."""
+    base = {(r["mode"], float(r["level"])): r for r in baseline.get("steps", [])}
+    problems = []
+    print("\nvs baseline:")
+    for row in rows:
+        ref = base.get((row["mode"], float(row["level"])))
+        if ref is None:
+            continue
+        d_rps = (row["throughput_rps"] - ref["throughput_rps"]) / ref["throughput_rps"] if ref["throughput_rps"] else 0.0
+        d_p99 = (row["p99_ms"] - ref["p99_ms"]) / ref["p99_ms"] if ref["p99_ms"] else 0.0
+        print(f"{row['mode']:>6} {row['level']:>7g} | throughput {d_rps:+7.1%} | p99 {d_p99:+7.1%}")
+        if d_rps < -tolerance:
+            problems.append(f"{row['mode']} {row['level']:g}: throughput {d_rps:+.1%}")
+        if d_p99 > tolerance:
+            problems.append(f"{row['mode']} {row['level']:g}: p99 {d_p99:+.1%}")
+    return problems
+
+
+# ---- main ----
+
+def _levels(value: str) -> list[float]:
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load generator for POST /v1/ocr")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/v1/ocr")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="closed loop: ramp, vd 1,2,4,8")
+    parser.add_argument("--rate", default="5,10,20", help="open loop: req/s mỗi bước, vd 5,10,20")
+    parser.add_argument("--poisson", action="store_true", help="open loop: khoảng cách request theo phân phối mũ")
+    parser.add_argument("--max-inflight", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=20.0, help="giây mỗi bước")
+    parser.add_argument("--warmup", type=float, default=10.0, help="giây chạy trước, không tính")
+    parser.add_argument("--corpus", help="file corpus đóng gói sẵn (python -m bench.corpus), mmap")
+    parser.add_argument("--images", default="../images", help="thư mục ảnh thật")
+    parser.add_argument("--synthetic", type=float, default=0.0, help="tỉ lệ frame tổng hợp (0..1)")
+    parser.add_argument("--synthetic-size", default="1280x720")
+    parser.add_argument("--payloads", type=int, default=256, help="số payload nạp sẵn (khi không có --corpus)")
+    parser.add_argument("--raw", action="store_true", help="gửi body image/jpeg thay vì multipart")
+    parser.add_argument("--workers", type=int, default=1, help="số process gửi tải (mỗi process 1 event loop + pool)")
+    parser.add_argument("--cameras", type=int, default=0, help="số camera_id giả lập, chia đều cho các worker")
+    parser.add_argument("--camera-start", type=int, default=1)
+    parser.add_argument("--live", action=argparse.BooleanOptionalAction, default=True, help="in req/s mỗi giây")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="ghi kết quả JSON")
+    parser.add_argument("--csv", help="ghi kết quả CSV (1 dòng / bước)")
+    parser.add_argument("--baseline", help="JSON của lần chạy trước để so sánh")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    return parser.parse_args(argv)
+
+
+_corpus: Corpus | None = None
+
+
+def load_corpus(args: argparse.Namespace) -> Corpus:
+    # nạp 1 lần ở process cha; worker fork thừa hưởng luôn (spawn thì tự nạp lại)
+    global _corpus
+    if _corpus is None:
+        if args.corpus:
+            _corpus = Corpus.open(Path(args.corpus))
+        else:
+            w, h = (int(v) for v in args.synthetic_size.lower().split("x"))
+            images = Path(args.images) if args.images else None
+            _corpus = Corpus.build(images, args.synthetic, args.payloads, (w, h), args.seed)
+    return _corpus
+
+
+def _share(level: float, mode: str, worker: int, workers: int) -> float:
+    """This worker's part of a step: concurrency is dealt out, rate is split evenly."""
+    if mode == "closed":
+        n = int(level)
+        return n // workers + (1 if worker < n % workers else 0)
+    return level / workers
+
+
+class LiveMeter:
+    """Prints fleet-wide throughput about once per second from worker ticks."""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.t0 = self.last = time.perf_counter()
+        self.ok = self.err = 0
+
+    def add(self, ok: int, err: int) -> None:
+        self.ok += ok
+        self.err += err
+
+    def flush(self) -> None:
+        now = time.perf_counter()
+        dt = now - self.last
+        if dt < 1.0:
+            return
+        if self.enabled and (self.ok or self.err):
+            print(f"  [{now - self.t0:6.0f}s] {self.ok / dt:9.1f} req/s {self.err / dt:7.1f} err/s", flush=True)
+        self.last, self.ok, self.err = now, 0, 0
+
+
+async def run_worker(args: argparse.Namespace, levels: list[float], worker: int = 0, workers: int = 1,
+                     tick=None, on_step=None, barrier=None) -> None:
+    """Run warm-up + every step in this process; `barrier` lines workers up before each step."""
+    import aiohttp
+
+    requests = load_corpus(args).requests(args.raw)
+    targets = worker_targets(args.url, args.cameras, args.camera_start, worker, workers)
+    shares = [_share(level, args.mode, worker, workers) for level in levels]
+    limit = max(1, int(max(shares))) if args.mode == "closed" else max(1, args.max_inflight // workers)
+    connector = aiohttp.TCPConnector(limit=limit)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        gen = LoadGenerator(session, targets, requests, args.seed + worker)
+        if args.warmup > 0:
+            if barrier is not None:
+                barrier.wait()
+            await gen.run_step(args.mode, shares[0], args.warmup, args, record=False)
+        for i, (level, share) in enumerate(zip(levels, shares)):
+            if barrier is not None:
+                barrier.wait()
+            stats = await gen.run_step(args.mode, share, args.duration, args, record=True, tick=tick)
+            stats.level = level
+            on_step(i, stats)
+
+
+def _worker_main(args: argparse.Namespace, levels: list[float], worker: int, workers: int, q, barrier) -> None:
+    try:
+        asyncio.run(run_worker(
+            args, levels, worker, workers,
+            tick=lambda ok, err: q.put(("tick", worker, ok, err)),
+            on_step=lambda i, stats: q.put(("step", worker, i, stats.to_dict())),
+            barrier=barrier,
+        ))
+        q.put(("done", worker))
+    except BaseException as e:
+        barrier.abort()  # các worker khác đang chờ barrier thì thoát luôn
+        q.put(("error", worker, f"{type(e).__name__}: {e}"))
+
+
+def run_processes(args: argparse.Namespace, levels: list[float], live: LiveMeter) -> list[dict]:
+    """Fork `args.workers` processes (own event loop + connection pool each), merge their stats per step."""
+    ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+    q = ctx.Queue()
+    barrier = ctx.Barrier(args.workers)
+    procs = [
+        ctx.Process(target=_worker_main, args=(args, levels, w, args.workers, q, barrier), daemon=True)
+        for w in range(args.workers)
+    ]
+    for proc in procs:
+        proc.start()
+
+    pending: dict[int, list[dict]] = {i: [] for i in range(len(levels))}
+    rows, done = [], 0
+    try:
+        while done < args.workers:
+            try:
+                msg = q.get(timeout=0.5)
+            except queue.Empty:
+                live.flush()
+                dead = [p for p in procs if p.exitcode not in (None, 0)]
+                if dead:
+                    raise RuntimeError(f"worker exited with code {dead[0].exitcode}")
+                continue
+            kind = msg[0]
+            if kind == "tick":
+                live.add(msg[2], msg[3])
+            elif kind == "step":
+                _, worker, i, raw = msg
+                pending[i].append(raw)
+                if len(pending[i]) == args.workers:
+                    stats = StepStats(mode=args.mode, level=levels[i])
+                    for part in pending.pop(i):
+                        stats.merge(StepStats.from_dict(args.mode, levels[i], part))
+                    row = stats.report()
+                    print_row(row)
+                    rows.append(row)
+            elif kind == "done":
+                done += 1
+            else:
+                raise RuntimeError(f"worker {msg[1]} failed: {msg[2]}")
+            live.flush()
+    finally:
+        for proc in procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+    return rows
+
+
+def run(args: argparse.Namespace) -> dict:
+    corpus = load_corpus(args)
+    levels = _levels(args.concurrency if args.mode == "closed" else args.rate)
+    print(f"{len(corpus)} payloads ({corpus.nbytes / 1024 / 1024:.1f} MB) | {args.mode} loop | levels={levels}"
+          f" | {args.duration:g}s/step | {args.workers} worker(s) | {args.cameras} camera(s) | {args.url}")
+    if args.warmup > 0:
+        print(f"warm-up {args.warmup:g}s ...")
+
+    live = LiveMeter(args.live)
+    if args.workers > 1:
+        rows = run_processes(args, levels, live)
+    else:
+        rows = []
+
+        def tick(ok, err):
+            live.add(ok, err)
+            live.flush()
+
+        def on_step(i, stats):
+            row = stats.report()
+            print_row(row)
+            rows.append(row)
+
+        asyncio.run(run_worker(args, levels, tick=tick, on_step=on_step))
+
+    return {
+        "url": args.url,
+        "mode": args.mode,
+        "raw": args.raw,
+        "workers": args.workers,
+        "cameras": args.cameras,
+        "payloads": len(corpus),
+        "synthetic": args.synthetic,
+        "duration_s": args.duration,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "steps": rows,
+    }
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    result = run(args)
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2), encoding="utf-8")
+    if args.csv:
+        write_csv(Path(args.csv), result["steps"])
+    if args.baseline:
+        problems = compare(result["steps"], json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        if problems:
+            print("REGRESSION: " + "; ".join(problems))
+            return 1
+        print("OK: no regression beyond", f"{args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
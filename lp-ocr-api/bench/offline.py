@@ -0,0 +1,221 @@
+"""
+Offline throughput of the OCR pipeline, without HTTP / uvicorn.
+
+Loads the model(s) with load_model_once (same .env / MODEL_BACKEND as the server)
+and runs a directory of images through each stage:
+
+    decode       decode_image (DECODE_TARGET_SIZE, like inference_pool.decode)
+    forward      model(imgs) inside run_ocr_batch (letterbox + net + NMS)
+    postprocess  ocr_service postprocessing, per image
+
+at every batch size x torch thread count, printing ns/op per image, images/s and
+peak RSS.
+
+    python -m bench.offline --images ../images --batch-sizes 1,4,8 --threads 1,2,4
+    # cProfile (snakeviz / pstats) + collapsed stacks (flamegraph.pl, speedscope, inferno;
+    # cùng định dạng với py-spy record --format raw)
+    python -m bench.offline --profile offline.prof --flame offline.folded
+    # hoặc sample từ ngoài: py-spy record -o flame.svg -- python -m bench.offline
+
+--threads sets torch.set_num_threads; the onnxruntime backend keeps the thread
+pool of its session, so for it only the batch size axis is meaningful.
+"""
+from __future__ import annotations
+
+import argparse
+import cProfile
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)  # Linux: KB, macOS: bytes
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples one thread's Python stack every `interval` seconds and counts
+    collapsed stacks ("outer;inner;leaf count"), the input format of flamegraph.pl.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+    def dump(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+def load_images(folder: Path, limit: int) -> list[tuple[str, bytes]]:
+    files = sorted(p for p in folder.iterdir() if p.suffix.lower() in IMAGE_EXTS)
+    if limit > 0:
+        files = files[:limit]
+    return [(p.name, p.read_bytes()) for p in files]
+
+
+def bench_decode(contents: list[bytes], target_size: int, max_side: int, repeat: int) -> tuple[list, dict]:
+    from app.services.image_io import decode_image
+
+    decoded = []
+    t0 = time.perf_counter_ns()
+    for r in range(repeat):
+        for content in contents:
+            d = decode_image(content, target_size, None, max_side)
+            if r == 0 and d is not None:
+                decoded.append(d.img)
+    elapsed = time.perf_counter_ns() - t0
+    n = len(contents) * repeat
+    return decoded, {"target_size": target_size, "images": n,
+                     "ns_per_op": elapsed // n, "images_s": round(n / (elapsed / 1e9), 2)}
+
+
+def bench_model(model, imgs: list, batch_size: int, threads: int, repeat: int) -> dict:
+    import torch
+
+    from app.services.ocr_service import run_ocr_batch
+
+    torch.set_num_threads(threads)
+    run_ocr_batch(model, imgs[:batch_size])  # đổi số thread / batch shape: chạy nháp 1 lần
+    forward_ns = postprocess_ns = 0.0
+    n = 0
+    t0 = time.perf_counter_ns()
+    for _ in range(repeat):
+        for i in range(0, len(imgs), batch_size):
+            results = run_ocr_batch(model, imgs[i:i + batch_size])
+            forward_ns += results[0]["timings_ms"]["forward"] * 1e6
+            postprocess_ns += sum(r["timings_ms"]["postprocess"] for r in results) * 1e6
+            n += len(results)
+    elapsed = time.perf_counter_ns() - t0
+    return {
+        "batch_size": batch_size,
+        "threads": threads,
+        "images": n,
+        "forward_ns_per_op": int(forward_ns / n),
+        "postprocess_ns_per_op": int(postprocess_ns / n),
+        "images_s": round(n / (elapsed / 1e9), 2),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmark of decode / forward / postprocess")
+    parser.add_argument("--images", default="../images", help="thư mục ảnh")
+    parser.add_argument("--limit", type=int, default=0, help="chỉ lấy N ảnh đầu")
+    parser.add_argument("--model", help="tên model trong MODELS (mặc định: DEFAULT_MODEL)")
+    parser.add_argument("--batch-sizes", default="1,4,8")
+    parser.add_argument("--threads", default="1,2,4", help="torch.set_num_threads, vd 1,2,4")
+    parser.add_argument("--repeat", type=int, default=3, help="số lượt qua cả thư mục mỗi cấu hình")
+    parser.add_argument("--decode-target", type=int, help="mặc định DECODE_TARGET_SIZE; 0 = decode full size")
+    parser.add_argument("--profile", help="ghi cProfile (pstats) của phần đo")
+    parser.add_argument("--flame", help="ghi collapsed stacks (flamegraph.pl / speedscope)")
+    parser.add_argument("--out", help="ghi kết quả JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.getLogger("ocr_service").setLevel(logging.ERROR)  # ảnh không có biển: bỏ warning mỗi ảnh
+    from app.core.config import settings
+    from app.models.loader import get_model, load_model_once, startup_timings
+
+    images = load_images(Path(args.images), args.limit)
+    if not images:
+        print(f"No images in {args.images}")
+        return 1
+    rss_before = peak_rss_mb()
+    load_model_once()
+    model = get_model(args.model)
+    print(f"{len(images)} images | backend={settings.MODEL_BACKEND} | model={args.model or 'default'}"
+          f" | load {startup_timings.get('load', 0):.0f}ms | peak RSS {rss_before} -> {peak_rss_mb()} MB")
+
+    profiler = cProfile.Profile() if args.profile else None
+    sampler = StackSampler(threading.get_ident()) if args.flame else None
+    if sampler is not None:
+        sampler.start()
+    if profiler is not None:
+        profiler.enable()
+
+    target = settings.DECODE_TARGET_SIZE if args.decode_target is None else args.decode_target
+    imgs, decode = bench_decode([c for _, c in images], target, settings.MAX_IMAGE_SIDE, args.repeat)
+    print(f"decode      target={target:<5} | {decode['ns_per_op']:>14,} ns/op | {decode['images_s']:>8.1f} img/s")
+    if not imgs:
+        print(f"None of the {len(images)} images in {args.images} could be decoded, nothing to run the model on")
+        return 1
+
+    print(f"{'batch':>5} {'thr':>4} | {'forward ns/op':>14} | {'postproc ns/op':>14} | {'img/s':>8} | {'e2e img/s':>9} | peak RSS MB")
+    rows = []
+    for threads in _ints(args.threads):
+        for batch_size in _ints(args.batch_sizes):
+            row = bench_model(model, imgs, batch_size, threads, args.repeat)
+            # e2e: decode + forward + postprocess nối tiếp trên 1 luồng
+            row["e2e_images_s"] = round(1e9 / (decode["ns_per_op"] + row["forward_ns_per_op"] + row["postprocess_ns_per_op"]), 2)
+            rows.append(row)
+            print(f"{batch_size:>5} {threads:>4} | {row['forward_ns_per_op']:>14,} | {row['postprocess_ns_per_op']:>14,}"
+                  f" | {row['images_s']:>8.1f} | {row['e2e_images_s']:>9.1f} | {row['peak_rss_mb']}")
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        print(f"cProfile -> {args.profile} (snakeviz {args.profile})")
+    if sampler is not None:
+        sampler.stop()
+        sampler.dump(Path(args.flame))
+        print(f"collapsed stacks -> {args.flame} ({sum(sampler.stacks.values())} samples; flamegraph.pl {args.flame} > flame.svg)")
+
+    if args.out:
+        result = {
+            "images": len(images),
+            "backend": settings.MODEL_BACKEND,
+            "model": args.model,
+            "repeat": args.repeat,
+            "startup_ms": {k: round(v, 1) for k, v in startup_timings.items()},
+            "decode": decode,
+            "model_runs": rows,
+            "peak_rss_mb": peak_rss_mb(),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        Path(args.out).write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
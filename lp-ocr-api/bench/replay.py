@@ -0,0 +1,236 @@
+"""
+Shadow-traffic replay: re-send archived frames (IMG_FOLDER) to a /v1/ocr instance
+with the original timing, optionally to a second instance to diff the text.
+
+    # 1 ngày ảnh đã lưu, nhanh gấp 10 lần, so backend mới (8001) với bản đang chạy (8000)
+    python -m bench.replay img/20250101 --target http://127.0.0.1:8001/v1/ocr \
+        --compare http://127.0.0.1:8000/v1/ocr --speed 10 --out replay.json --csv replay.csv
+
+Frames are read from both archive layouts:
+    {root}/{YYYYMMDD}/cam_{camera_id}/ocr_{camera_id}_{YYYYmmdd_HHMMSS}_{ns}[_{seq}].jpg
+    {root}/ocr_{camera_id}_{YYYYmmdd_HHMMSS}.jpg   (bản cũ, chỉ tới giây)
+
+Each camera is replayed by its own sender in capture order, one request at a time
+(like the camera itself), so a slow target shows up as lag behind the schedule
+rather than as reordered frames. Requests go out with archive=false so the target
+does not archive the replayed frames again.
+
+Needs aiohttp (client side only, not in requirements.txt).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import re
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from bench.histogram import LatencyHistogram
+
+NAME_RE = re.compile(
+    r"^ocr_(?P<cam>[^_]+)_(?P<date>\d{8})_(?P<time>\d{6})(?:_(?P<ns>\d{9}))?(?:_(?P<seq>\d+))?\.jpe?g$",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Frame:
+    ts: float  # epoch seconds lúc chụp (theo tên file)
+    seq: int
+    camera: str
+    path: Path
+
+
+def parse_name(path: Path) -> Frame | None:
+    m = NAME_RE.match(path.name)
+    if m is None:
+        return None
+    captured = datetime.strptime(m["date"] + m["time"], "%Y%m%d%H%M%S")
+    ts = captured.timestamp() + (int(m["ns"]) / 1e9 if m["ns"] else 0.0)
+    return Frame(ts=ts, seq=int(m["seq"] or 0), camera=m["cam"], path=path)
+
+
+def scan(root: Path, cameras: set[str] | None = None, limit: int = 0) -> tuple[list[Frame], int]:
+    """All archived frames under `root` in capture order; also returns the number of skipped files."""
+    frames, skipped = [], 0
+    for path in root.rglob("ocr_*"):
+        frame = parse_name(path)
+        if frame is None:
+            skipped += 1
+            continue
+        if cameras and frame.camera not in cameras:
+            continue
+        frames.append(frame)
+    frames.sort(key=lambda f: (f.ts, f.seq, f.camera))
+    if limit > 0:
+        frames = frames[:limit]
+    return frames, skipped
+
+
+class Target:
+    """One instance under test: latency histogram + status counts."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.hist = LatencyHistogram()
+        self.statuses: dict[str, int] = {}
+
+    async def send(self, session, content: bytes, camera: str) -> tuple[str, str | None, float]:
+        params = {"archive": "false"}
+        if camera.isdigit():
+            params["camera_id"] = camera
+        t0 = time.perf_counter()
+        text = None
+        try:
+            async with session.post(self.url, data=content, params=params,
+                                    headers={"Content-Type": "image/jpeg"}) as resp:
+                body = await resp.read()
+                status = str(resp.status)
+                if resp.status == 200:
+                    text = json.loads(body).get("text", "")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            status = f"error:{type(e).__name__}"
+        elapsed = time.perf_counter() - t0
+        self.hist.record(elapsed)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        return status, text, elapsed
+
+    def report(self) -> dict:
+        ok = self.statuses.get("200", 0)
+        total = sum(self.statuses.values())
+        return {"url": self.url, "requests": total, "ok": ok, "errors": total - ok,
+                "statuses": dict(sorted(self.statuses.items())), **self.hist.summary()}
+
+
+async def replay(frames: list[Frame], targets: list[Target], speed: float, timeout: float) -> tuple[list[dict], LatencyHistogram, float]:
+    import aiohttp
+
+    by_camera: dict[str, list[Frame]] = {}
+    for frame in frames:
+        by_camera.setdefault(frame.camera, []).append(frame)
+    t0 = frames[0].ts
+    lag = LatencyHistogram()
+    records: list[dict] = []
+    loop = asyncio.get_running_loop()
+
+    async def camera_sender(session, cam_frames: list[Frame], start: float) -> None:
+        for frame in cam_frames:
+            at = start + (frame.ts - t0) / speed if speed > 0 else time.perf_counter()
+            delay = at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lag.record(max(0.0, time.perf_counter() - at))
+            content = await loop.run_in_executor(None, frame.path.read_bytes)
+            results = await asyncio.gather(*(t.send(session, content, frame.camera) for t in targets))
+            record = {"file": str(frame.path), "camera": frame.camera,
+                      "captured": datetime.fromtimestamp(frame.ts).strftime("%Y-%m-%d %H:%M:%S.%f")}
+            for target, (status, text, elapsed) in zip(targets, results):
+                record[f"{target.name}_status"] = status
+                record[f"{target.name}_text"] = text
+                record[f"{target.name}_ms"] = round(elapsed * 1000, 3)
+            records.append(record)
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(camera_sender(session, cam_frames, start) for cam_frames in by_camera.values()))
+        elapsed = time.perf_counter() - start
+    records.sort(key=lambda r: (r["captured"], r["camera"]))
+    return records, lag, elapsed
+
+
+def text_diffs(records: list[dict]) -> list[dict]:
+    """Frames where target and compare disagree (text, or one of them failed)."""
+    return [
+        {"file": r["file"], "camera": r["camera"], "target": r["target_text"], "compare": r["compare_text"],
+         "target_status": r["target_status"], "compare_status": r["compare_status"]}
+        for r in records
+        if r["target_text"] != r["compare_text"]
+    ]
+
+
+def print_target(target: Target) -> None:
+    row = target.report()
+    print(
+        f"{target.name:>7} {row['ok']:>6} ok {row['errors']:>4} err"
+        f" | p50 {row['p50_ms']:>8.1f} p95 {row['p95_ms']:>8.1f} p99 {row['p99_ms']:>8.1f}"
+        f" max {row['max_ms']:>8.1f} ms | {target.url}"
+    )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay archived frames against /v1/ocr")
+    parser.add_argument("root", help="thư mục ảnh đã lưu (IMG_FOLDER hoặc 1 ngày / 1 camera trong đó)")
+    parser.add_argument("--target", default="http://127.0.0.1:8000/v1/ocr")
+    parser.add_argument("--compare", help="instance thứ 2: gửi cùng frame, so text")
+    parser.add_argument("--speed", type=float, default=1.0, help="tăng tốc thời gian thật; 0 = gửi liên tục")
+    parser.add_argument("--cameras", help="chỉ replay các camera này, vd 1,2")
+    parser.add_argument("--limit", type=int, default=0, help="tối đa N frame đầu tiên")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--show-diffs", type=int, default=20, help="in tối đa N frame khác text")
+    parser.add_argument("--out", help="ghi tổng kết + danh sách diff (JSON)")
+    parser.add_argument("--csv", help="ghi kết quả từng frame (CSV)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    cameras = {c.strip() for c in args.cameras.split(",")} if args.cameras else None
+    frames, skipped = scan(Path(args.root), cameras, args.limit)
+    if not frames:
+        print(f"No archived frames under {args.root}")
+        return 1
+    span = frames[-1].ts - frames[0].ts
+    n_cams = len({f.camera for f in frames})
+    print(f"{len(frames)} frames | {n_cams} camera(s) | span {span:.1f}s | speed {args.speed:g}x"
+          + (f" | skipped {skipped} files" if skipped else ""))
+
+    targets = [Target("target", args.target)]
+    if args.compare:
+        targets.append(Target("compare", args.compare))
+    records, lag, elapsed = asyncio.run(replay(frames, targets, args.speed, args.timeout))
+
+    print(f"replayed in {elapsed:.1f}s")
+    for target in targets:
+        print_target(target)
+    lag_row = lag.summary()
+    print(f"    lag p50 {lag_row['p50_ms']:>8.1f} p99 {lag_row['p99_ms']:>8.1f} max {lag_row['max_ms']:>8.1f} ms (trễ so với lịch)")
+
+    diffs = text_diffs(records) if args.compare else []
+    if args.compare:
+        print(f"text diffs: {len(diffs)} / {len(records)} ({len(diffs) / len(records):.2%})")
+        for d in diffs[:args.show_diffs]:
+            print(f"  cam {d['camera']} {Path(d['file']).name}: {d['target']!r} != {d['compare']!r}")
+
+    if args.out:
+        result = {
+            "root": args.root,
+            "frames": len(frames),
+            "cameras": n_cams,
+            "span_s": round(span, 3),
+            "speed": args.speed,
+            "elapsed_s": round(elapsed, 3),
+            "targets": {t.name: t.report() for t in targets},
+            "lag": lag_row,
+            "diffs": diffs,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        Path(args.out).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
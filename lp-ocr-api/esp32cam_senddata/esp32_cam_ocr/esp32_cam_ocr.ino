@@ -29,6 +29,11 @@
 #define HREF_GPIO_NUM     23
 #define PCLK_GPIO_NUM     22
 
+// ================= OCR API =================
+#define OCR_HOST  "192.168.1.71"
+#define OCR_PORT  8000
+#define CAMERA_ID 1
+
 // ================= GLOBAL =================
 String tbUrl;
 unsigned long lastTelemetry = 0;
@@ -87,6 +92,43 @@ bool initCamera() {
 }
 
 // ================= SEND TO OCR API =================
+// POST ảnh JPEG thẳng lên /v1/ocr/raw/{camera_id} (không multipart),
+// giữ 1 kết nối keep-alive cho mọi frame. format=event: server gộp nhiều frame
+// của cùng 1 xe và chỉ trả biển số 1 lần -> ThingsBoard nhận 1 telemetry / xe.
+WiFiClient ocrClient;
+
+bool readOCRResponse(String &text) {
+  int status = 0;
+  int contentLength = -1;
+  bool closeAfter = false;
+
+  // status line + headers
+  String line = ocrClient.readStringUntil('\n');
+  if (line.length() == 0) return false;
+  status = line.substring(9, 12).toInt();
+  while (true) {
+    line = ocrClient.readStringUntil('\n');
+    line.trim();
+    if (line.length() == 0) break;
+    line.toLowerCase();
+    if (line.startsWith("content-length:")) {
+      contentLength = line.substring(15).toInt();
+    } else if (line.startsWith("connection: close")) {
+      closeAfter = true;  // server sẽ đóng, lần sau connect lại
+    }
+  }
+
+  text = "";
+  if (contentLength > 0) {
+    char buf[128];
+    int n = ocrClient.readBytes(buf, min(contentLength, (int)sizeof(buf) - 1));
+    buf[n] = '\0';
+    text = String(buf);
+  }
+  if (closeAfter) ocrClient.stop();
+  return status == 200;
+}
+
 void sendToOCR() {
   camera_fb_t *fb = esp_camera_fb_get();
   if (!fb) {
@@ -104,74 +146,45 @@ void sendToOCR() {
     return;
   }
 
-  WiFiClient client;
-  const char* host = "127.0.0.1";
-  int port = 8000;
-  String path = "/v1/ocr";
-
-  // Kết nối tới server với timeout
-  client.setTimeout(10000);
-  if (!client.connect(host, port)) {
-    esp_camera_fb_return(fb);
-    return;
+  // Kết nối tới server với timeout (chỉ khi chưa có kết nối keep-alive)
+  ocrClient.setTimeout(10000);
+  if (!ocrClient.connected()) {
+    if (!ocrClient.connect(OCR_HOST, OCR_PORT)) {
+      Serial.println("[OCR] Connect FAILED");
+      esp_camera_fb_return(fb);
+      return;
+    }
+    Serial.println("[OCR] Connected to server");
   }
 
-  Serial.println("[OCR] Connected to server");
-
-  // Xây dựng multipart form data
-  String boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW";
-  String startBoundary = "--" + boundary + "\r\n";
-  String contentDisposition = "Content-Disposition: form-data; name=\"file\"; filename=\"esp32_cam.jpg\"\r\n";
-  String contentType = "Content-Type: image/jpeg\r\n\r\n";
-  String endBoundary = "\r\n--" + boundary + "--\r\n";
-
-  // Tính toán Content-Length
-  uint32_t contentLength = startBoundary.length() + contentDisposition.length() + 
-                          contentType.length() + fb->len + endBoundary.length();
-
-  // Gửi HTTP request header
-  client.print("POST ");
-  client.print(path);
-  client.println(" HTTP/1.1");
-  client.print("Host: ");
-  client.print(host);
-  client.print(":");
-  client.println(port);
-  client.println("Connection: close");
-  client.print("Content-Type: multipart/form-data; boundary=");
-  client.println(boundary);
-  client.print("Content-Length: ");
-  client.println(contentLength);
-  client.println();
-
-  // Gửi multipart body
-  client.print(startBoundary);
-  client.print(contentDisposition);
-  client.print(contentType);
-  
-  client.write(fb->buf, fb->len);
-  client.print(endBoundary);
-
-  // Đợi response
-  delay(1000);
-
-  // Đọc response
-  String response = "";
-  while (client.connected() || client.available()) {
-    if (client.available()) {
-      String line = client.readStringUntil('\n');
-      response += line;
+  // Gửi HTTP request header + body JPEG
+  ocrClient.print("POST /v1/ocr/raw/");
+  ocrClient.print(CAMERA_ID);
+  ocrClient.println("?format=event HTTP/1.1");
+  ocrClient.print("Host: ");
+  ocrClient.print(OCR_HOST);
+  ocrClient.print(":");
+  ocrClient.println(OCR_PORT);
+  ocrClient.println("Connection: keep-alive");
+  ocrClient.println("Content-Type: image/jpeg");
+  ocrClient.print("Content-Length: ");
+  ocrClient.println(fb->len);
+  ocrClient.println();
+  ocrClient.write(fb->buf, fb->len);
+  esp_camera_fb_return(fb);
+
+  // Đọc response: body là biển số đã chốt (1 lần mỗi xe), rỗng ở các frame còn lại
+  String text;
+  if (readOCRResponse(text)) {
+    if (text.length() > 0) {
+      Serial.print("[OCR] plate=");
+      Serial.println(text);
+      sendOCRResultToThingsBoard(text);
     }
+  } else {
+    Serial.println("[OCR] Request FAILED");
+    ocrClient.stop();
   }
-
-  client.stop();
-
-  // Trích xuất JSON từ response (bỏ qua HTTP header)
-  int jsonStart = response.indexOf('{');
-  if (jsonStart >= 0) {
-    String jsonResponse = response.substring(jsonStart);
-    sendOCRResultToThingsBoard(jsonResponse);
-  }  esp_camera_fb_return(fb);
 }
 
 // ================= SEND OCR RESULT TO THINGSBOARD =================